@@ -0,0 +1,153 @@
+"""Замеры скорости генерации, открытия клеток и отрисовки поля.
+
+Запуск: python benchmark.py [--duration 0.5] [--json results.json]
+Окно не создается: pygame работает с SDL_VIDEODRIVER=dummy.
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+
+import projectlms
+from game_logic import Game, LazyBoard, new_game
+
+CUSTOM_SIZE = (40, 40, 320)
+LARGE_SIZE = (1000, 1000, 150000)
+LAZY_SIZE = (100000, 100000, 2000000000)
+SIZES = {
+    "Легкий": projectlms.EASY_SIZE,
+    "Средний": projectlms.MEDIUM_SIZE,
+    "Сложный": projectlms.HARD_SIZE,
+    "Пользовательский 40x40": CUSTOM_SIZE,
+}
+
+
+def rate(action, duration):
+    """Возвращает число вызовов action в секунду за время duration."""
+    count = 0
+    start = time.perf_counter()
+    while True:
+        action()
+        count += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= duration:
+            return count / elapsed
+
+
+def bench_generation(size, duration):
+    return rate(lambda: new_game(*size), duration)
+
+
+def bench_reveal(size, duration):
+    """Открывает по одной случайной безопасной клетке в новых партиях."""
+    width, height, num_mines = size
+    count = 0
+    elapsed = 0.0
+    while elapsed < duration:
+        batch = []
+        for _ in range(100):
+            game = new_game(width, height, num_mines)
+            x, y = random.randrange(width), random.randrange(height)
+            while game.board.is_mine(x, y):
+                x, y = random.randrange(width), random.randrange(height)
+            batch.append((game, x, y))
+        start = time.perf_counter()
+        for game, x, y in batch:
+            game.reveal(x, y)
+        elapsed += time.perf_counter() - start
+        count += len(batch)
+    return count / elapsed
+
+
+def bench_render(size, duration):
+    """Возвращает время полной перерисовки кадра в миллисекундах."""
+    width, height, num_mines = size
+    window_size, cell_size, view = projectlms.board_layout(width, height, num_mines)
+    screen = pygame.display.set_mode(window_size)
+    game = new_game(width, height, num_mines)
+    for _ in range(width * height // 10):
+        game.toggle_flag(random.randrange(width), random.randrange(height))
+        game.reveal(random.randrange(width), random.randrange(height))
+    renderer = projectlms.BoardRenderer(game.board, projectlms.Camera(view, width, height, cell_size))
+    start_time = time.time()
+
+    def frame():
+        # Без кэша кусков каждая клетка рисуется заново, а не копируется с готовой поверхности
+        renderer.chunks.clear()
+        renderer.invalidate()
+        pygame.display.update(projectlms.draw_grid(screen, renderer, start_time=start_time, num_mines=num_mines))
+
+    return 1000 / rate(frame, duration)
+
+
+def bench_scroll(size, duration):
+    """Возвращает время кадра в миллисекундах при прокрутке большого поля.
+
+    Каждый кадр камера сдвигается на четверть клетки и один раз на кадр
+    открывается случайная клетка.
+    """
+    width, height, num_mines = size
+    window_size, cell_size, view = projectlms.board_layout(width, height, num_mines)
+    screen = pygame.display.set_mode(window_size)
+    game = new_game(width, height, num_mines)
+    camera = projectlms.Camera(view, width, height, cell_size)
+    renderer = projectlms.BoardRenderer(game.board, camera)
+    start_time = time.time()
+    direction = [cell_size // 4 or 1]
+
+    def frame():
+        if camera.x + view.width >= width * cell_size or camera.x == 0 and direction[0] < 0:
+            direction[0] = -direction[0]
+        camera.pan(direction[0], direction[0])
+        game.board.reveal(random.randrange(width), random.randrange(height))
+        pygame.display.update(projectlms.draw_grid(screen, renderer, start_time=start_time, num_mines=num_mines))
+
+    return 1000 / rate(frame, duration)
+
+
+def bench_lazy_start(size, duration):
+    """Возвращает время в микросекундах от создания ленивой партии до первого открытия."""
+    width, height, num_mines = size
+
+    def start():
+        game = Game(LazyBoard(width, height, num_mines, random.getrandbits(63)), num_mines)
+        game.reveal(width // 2, height // 2)
+
+    return 1000000 / rate(start, duration)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--duration', type=float, default=0.5, help="время одного замера, сек")
+    parser.add_argument('--json', help="файл для сохранения результатов")
+    args = parser.parse_args()
+
+    pygame.init()
+    results = {}
+    for name, size in SIZES.items():
+        results[name] = {
+            "boards_per_sec": bench_generation(size, args.duration),
+            "reveals_per_sec": bench_reveal(size, args.duration),
+            "frame_ms": bench_render(size, args.duration),
+        }
+        print(f"{name:<24} поля/сек: {results[name]['boards_per_sec']:>10.0f}"
+              f"  открытия/сек: {results[name]['reveals_per_sec']:>10.0f}"
+              f"  кадр: {results[name]['frame_ms']:>7.2f} мс")
+    results["Прокрутка 1000x1000"] = {"frame_ms": bench_scroll(LARGE_SIZE, args.duration)}
+    print(f"{'Прокрутка 1000x1000':<24} кадр: {results['Прокрутка 1000x1000']['frame_ms']:>7.2f} мс")
+    results["Ленивое 100000x100000"] = {"start_us": bench_lazy_start(LAZY_SIZE, args.duration)}
+    print(f"{'Ленивое 100000x100000':<24} старт и первый ход: {results['Ленивое 100000x100000']['start_us']:>7.0f} мкс")
+    pygame.quit()
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as file:
+            json.dump(results, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
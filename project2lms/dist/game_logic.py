@@ -0,0 +1,477 @@
+"""Правила игры "Сапер" без зависимости от pygame."""
+import random
+from collections import OrderedDict, deque
+from datetime import datetime
+
+EASY_SIZE = (9, 9, 10)
+MEDIUM_SIZE = (16, 16, 40)
+HARD_SIZE = (30, 16, 99)
+# Сторона куска ленивого поля в клетках и сколько списков мин кусков помнить
+LAZY_CHUNK = 32
+MINE_CACHE_SIZE = 4096
+# Сколько клеток за раз открывает Game.advance, если лимит не задан
+REVEAL_BATCH = 1024
+# seed поля помещается в знаковое 64-битное целое SQLite
+SEED_BITS = 63
+# Сколько клеток (байтов) готовых полей держит BoardCache
+BOARD_CACHE_CELLS = 4 * 1024 * 1024
+# Ежедневное испытание: одно поле на день для всех игроков
+DAILY_SIZE = MEDIUM_SIZE
+DAILY_NAME = "Ежедневное"
+
+# --- Функции игры ---
+def new_seed():
+    """Возвращает случайный seed для нового поля."""
+    return random.getrandbits(SEED_BITS)
+
+
+def generate_mines(width, height, num_mines, seed=None):
+    """Генерирует координаты мин; с одним и тем же seed они всегда одинаковы."""
+    total_cells = width * height
+    if num_mines >= total_cells:
+        raise ValueError("Слишком много мин для поля!")
+    rng = random if seed is None else random.Random(seed)
+    return rng.sample(range(total_cells), num_mines)
+
+
+def get_cell_coords(index, width):
+    """Преобразует индекс в координаты клетки."""
+    return index % width, index // width
+
+
+def count_adjacent_mines(grid, x, y):
+    """Считает количество мин вокруг клетки (x, y)."""
+    count = 0
+    for i in range(max(0, x - 1), min(x + 2, len(grid[0]))):
+        for j in range(max(0, y - 1), min(y + 2, len(grid))):
+            if grid[j][i] == '*':
+                count += 1
+    return count
+
+
+def count_all_adjacent_mines(width, height, mine_indices):
+    """Считает числа для всех клеток поля сразу.
+
+    Маска мин с рамкой в одну клетку хранится в одном большом целом, по байту
+    на клетку, и сумма восьми ее сдвигов дает числа всех клеток. Результат
+    совпадает с count_adjacent_mines, вызванной для каждой клетки без мины.
+    """
+    stride = width + 2
+    size = stride * (height + 2)
+    padded = bytearray(size)
+    for index in mine_indices:
+        x, y = get_cell_coords(index, width)
+        padded[(y + 1) * stride + x + 1] = 1
+    mask = int.from_bytes(padded, 'little')
+    total = 0
+    for dy in (-1, 0, 1):
+        for dx in (-1, 0, 1):
+            shift = (dy * stride + dx) * 8
+            if shift > 0:
+                total += mask << shift
+            elif shift < 0:
+                total += mask >> -shift
+    sums = (total & ((1 << size * 8) - 1)).to_bytes(size, 'little')
+    counts = bytearray(width * height)
+    for y in range(height):
+        start = (y + 1) * stride + 1
+        counts[y * width:(y + 1) * width] = sums[start:start + width]
+    return counts
+
+
+def difficulty_name(width, height, num_mines):
+    """Возвращает название сложности для таблицы рекордов."""
+    if (width, height, num_mines) == EASY_SIZE:
+        return "Легкий"
+    elif (width, height, num_mines) == MEDIUM_SIZE:
+        return "Средний"
+    elif (width, height, num_mines) == HARD_SIZE:
+        return "Сложный"
+    return "Пользовательский"
+
+
+def daily_seed(day):
+    """seed поля ежедневного испытания за день day, одинаковый на всех компьютерах."""
+    return random.Random(f"daily:{day.isoformat()}").getrandbits(SEED_BITS)
+
+
+def daily_difficulty(day):
+    """Название сложности, под которым хранятся рекорды испытания за день day."""
+    return f"{DAILY_NAME} {day:%d-%m-%Y}"
+
+
+def daily_date(difficulty):
+    """День испытания по названию сложности или None для обычной сложности."""
+    prefix = DAILY_NAME + " "
+    if not difficulty or not difficulty.startswith(prefix):
+        return None
+    try:
+        return datetime.strptime(difficulty[len(prefix):], "%d-%m-%Y").date()
+    except ValueError:
+        return None
+
+
+class Board:
+    """Игровое поле в виде плоского массива байтов.
+
+    Каждая клетка занимает один байт: младшие 4 бита хранят число мин вокруг,
+    старшие биты - признаки мины, открытой клетки и флажка.
+    """
+    COUNT_MASK = 0x0F
+    MINE = 0x10
+    REVEALED = 0x20
+    FLAGGED = 0x40
+
+    def __init__(self, width, height):
+        self.seed = None
+        self.width = width
+        self.height = height
+        self.cells = bytearray(width * height)
+        self.revealed_count = 0
+        self.flagged_count = 0
+
+    @classmethod
+    def from_mines(cls, width, height, mine_indices):
+        """Создает поле по индексам мин и считает числа в клетках."""
+        board = cls(width, height)
+        board.cells = count_all_adjacent_mines(width, height, mine_indices)
+        for index in mine_indices:
+            board.cells[index] = cls.MINE
+        return board
+
+    def in_bounds(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def is_mine(self, x, y):
+        return bool(self.cells[y * self.width + x] & self.MINE)
+
+    def is_revealed(self, x, y):
+        return bool(self.cells[y * self.width + x] & self.REVEALED)
+
+    def is_flagged(self, x, y):
+        return bool(self.cells[y * self.width + x] & self.FLAGGED)
+
+    def value(self, x, y):
+        """Число мин вокруг клетки."""
+        return self.cells[y * self.width + x] & self.COUNT_MASK
+
+    def reveal(self, x, y):
+        """Открывает клетку. Возвращает True, если она не была открыта."""
+        index = y * self.width + x
+        if self.cells[index] & self.REVEALED:
+            return False
+        self.cells[index] |= self.REVEALED
+        self.revealed_count += 1
+        return True
+
+    def toggle_flag(self, x, y):
+        """Ставит или снимает флажок с закрытой клетки."""
+        index = y * self.width + x
+        cell = self.cells[index]
+        if cell & self.REVEALED:
+            return
+        if cell & self.FLAGGED:
+            self.cells[index] = cell & ~self.FLAGGED
+            self.flagged_count -= 1
+        else:
+            self.cells[index] = cell | self.FLAGGED
+            self.flagged_count += 1
+
+
+class LazyCells:
+    """Клетки ленивого поля: байты по кускам LAZY_CHUNK x LAZY_CHUNK клеток.
+
+    Поддерживает чтение и запись по индексу и чтение срезов, как bytearray
+    обычного поля. Кусок создается при первом обращении к любой его клетке.
+    """
+
+    def __init__(self, board):
+        self.board = board
+        self.chunks = {}
+
+    def __len__(self):
+        return self.board.width * self.board.height
+
+    def _chunk(self, chunk_x, chunk_y):
+        chunk = self.chunks.get((chunk_x, chunk_y))
+        if chunk is None:
+            chunk = self.chunks[chunk_x, chunk_y] = self.board.materialize(chunk_x, chunk_y)
+        return chunk
+
+    def __getitem__(self, index):
+        width = self.board.width
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                raise ValueError("Шаг среза не поддерживается")
+            result = bytearray()
+            while start < stop:
+                x, y = start % width, start // width
+                count = min(stop - start, LAZY_CHUNK - x % LAZY_CHUNK, width - x)
+                chunk = self._chunk(x // LAZY_CHUNK, y // LAZY_CHUNK)
+                offset = y % LAZY_CHUNK * LAZY_CHUNK + x % LAZY_CHUNK
+                result += chunk[offset:offset + count]
+                start += count
+            return result
+        x, y = index % width, index // width
+        return self._chunk(x // LAZY_CHUNK, y // LAZY_CHUNK)[y % LAZY_CHUNK * LAZY_CHUNK + x % LAZY_CHUNK]
+
+    def __setitem__(self, index, value):
+        width = self.board.width
+        x, y = index % width, index // width
+        self._chunk(x // LAZY_CHUNK, y // LAZY_CHUNK)[y % LAZY_CHUNK * LAZY_CHUNK + x % LAZY_CHUNK] = value
+
+
+class LazyBoard(Board):
+    """Поле, клетки которого создаются по кускам при первом обращении.
+
+    Мины каждого куска выводятся из seed и номера куска, а их число
+    пропорционально числу клеток куска, так что всего на поле ровно
+    num_mines мин. Создание поля не зависит от его размера, а память
+    растет только с числом открытых или показанных кусков.
+    """
+
+    def __init__(self, width, height, num_mines, seed):
+        if num_mines >= width * height:
+            raise ValueError("Слишком много мин для поля!")
+        super().__init__(0, 0)
+        self.width = width
+        self.height = height
+        self.num_mines = num_mines
+        self.seed = seed
+        self.cells = LazyCells(self)
+        self.mine_cache = {}
+
+    def chunk_mines(self, chunk_x, chunk_y):
+        """Индексы мин куска внутри него (строки по LAZY_CHUNK клеток)."""
+        key = (chunk_x, chunk_y)
+        mines = self.mine_cache.get(key)
+        if mines is not None:
+            return mines
+        width, height = self.width, self.height
+        rows = min(LAZY_CHUNK, height - chunk_y * LAZY_CHUNK)
+        columns = min(LAZY_CHUNK, width - chunk_x * LAZY_CHUNK)
+        # Клетки кусков до этого по порядку строк кусков
+        before = chunk_y * LAZY_CHUNK * width + chunk_x * LAZY_CHUNK * rows
+        total = width * height
+        count = self.num_mines * (before + rows * columns) // total - self.num_mines * before // total
+        rng = random.Random(f"{self.seed}:{chunk_x}:{chunk_y}")
+        mines = [offset // columns * LAZY_CHUNK + offset % columns
+                 for offset in rng.sample(range(rows * columns), count)]
+        if len(self.mine_cache) >= MINE_CACHE_SIZE:
+            self.mine_cache.clear()
+        self.mine_cache[key] = mines
+        return mines
+
+    def materialize(self, chunk_x, chunk_y):
+        """Создает байты куска: мины и числа с учетом мин соседних кусков."""
+        chunks_x = (self.width + LAZY_CHUNK - 1) // LAZY_CHUNK
+        chunks_y = (self.height + LAZY_CHUNK - 1) // LAZY_CHUNK
+        # Мины куска и соседних кусков в рамке на клетку шире куска
+        side = LAZY_CHUNK + 2
+        padded = []
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                if not (0 <= chunk_x + dx < chunks_x and 0 <= chunk_y + dy < chunks_y):
+                    continue
+                for offset in self.chunk_mines(chunk_x + dx, chunk_y + dy):
+                    x = offset % LAZY_CHUNK + dx * LAZY_CHUNK + 1
+                    y = offset // LAZY_CHUNK + dy * LAZY_CHUNK + 1
+                    if 0 <= x < side and 0 <= y < side:
+                        padded.append(y * side + x)
+        counts = count_all_adjacent_mines(side, side, padded)
+        chunk = bytearray(LAZY_CHUNK * LAZY_CHUNK)
+        for row in range(LAZY_CHUNK):
+            start = (row + 1) * side + 1
+            chunk[row * LAZY_CHUNK:(row + 1) * LAZY_CHUNK] = counts[start:start + LAZY_CHUNK]
+        for offset in self.chunk_mines(chunk_x, chunk_y):
+            chunk[offset] = Board.MINE
+        return chunk
+
+
+class FloodFill:
+    """Открытие пустых областей по частям.
+
+    В очереди лежат открытые пустые клетки, соседей которых еще надо
+    открыть. За вызов step обрабатывается не больше limit клеток, так что
+    область на все поле открывается за несколько кадров, а память занимает
+    только ее граница, а не список всех открытых клеток.
+    """
+
+    def __init__(self, board):
+        self.board = board
+        self.queue = deque()
+
+    def start(self, x, y):
+        """Открывает клетку (x, y) и ставит ее в очередь, если она пустая."""
+        board = self.board
+        index = y * board.width + x
+        cell = board.cells[index]
+        if cell & (Board.REVEALED | Board.FLAGGED):
+            return
+        board.cells[index] = cell | Board.REVEALED
+        board.revealed_count += 1
+        if not cell & (Board.COUNT_MASK | Board.MINE):
+            self.queue.append(index)
+
+    def step(self, limit=None):
+        """Открывает соседей не больше limit клеток из очереди. Возвращает число открытых."""
+        board = self.board
+        width = board.width
+        total = width * board.height
+        cells = board.cells
+        revealed = Board.REVEALED
+        closed = Board.REVEALED | Board.FLAGGED
+        stop = Board.COUNT_MASK | Board.MINE
+        queue = self.queue
+        popleft = queue.popleft
+        append = queue.append
+        opened = 0
+        steps = 0
+        while queue and (limit is None or steps < limit):
+            steps += 1
+            index = popleft()
+            cx = index % width
+            left = index - 1 if cx > 0 else index
+            right = index + 2 if cx < width - 1 else index + 1
+            for row in (-width, 0, width):
+                if not 0 <= index + row < total:
+                    continue
+                for n in range(left + row, right + row):
+                    cell = cells[n]
+                    if not cell & closed:
+                        cells[n] = cell | revealed
+                        opened += 1
+                        if not cell & stop:
+                            append(n)
+        board.revealed_count += opened
+        return opened
+
+
+def open_empty_cells(board, x, y):
+    """Открывает клетку и всю пустую область вокруг нее сразу.
+
+    Клетки с флажками не открываются. Возвращает число вновь открытых клеток.
+    """
+    if not board.in_bounds(x, y):
+        return 0
+    before = board.revealed_count
+    fill = FloodFill(board)
+    fill.start(x, y)
+    fill.step()
+    return board.revealed_count - before
+
+
+class Game:
+    """Состояние одной партии: поле, флажки и итог игры.
+
+    Пустая область, открытая ходом, может открываться по частям: reveal с
+    limit открывает ее начало, а advance - следующие части.
+    """
+    PLAYING = 'playing'
+    WON = 'won'
+    LOST = 'lost'
+
+    def __init__(self, board, num_mines):
+        self.board = board
+        self.num_mines = num_mines
+        self.status = Game.PLAYING
+        self.fill = FloodFill(board)
+
+    @property
+    def mines_left(self):
+        return self.num_mines - self.board.flagged_count
+
+    @property
+    def pending(self):
+        """Осталась ли неоткрытая часть пустой области."""
+        return self.status == Game.PLAYING and bool(self.fill.queue)
+
+    def reveal(self, x, y, limit=None):
+        """Открывает клетку. Возвращает число открытых клеток.
+
+        Без limit пустая область вокруг клетки открывается целиком, иначе
+        обрабатывается не больше limit ее клеток. Открытие мины завершает
+        игру поражением, открытие последней безопасной клетки - победой.
+        """
+        board = self.board
+        if self.status != Game.PLAYING or not board.in_bounds(x, y) or board.is_flagged(x, y):
+            return 0
+        if board.is_mine(x, y):
+            self.status = Game.LOST
+            return 0
+        before = board.revealed_count
+        self.fill.start(x, y)
+        return board.revealed_count - before + self.advance(limit)
+
+    def advance(self, limit=REVEAL_BATCH):
+        """Открывает следующую часть пустой области (None - всю). Возвращает число открытых клеток."""
+        if self.status != Game.PLAYING:
+            return 0
+        opened = self.fill.step(limit)
+        board = self.board
+        if board.revealed_count == board.width * board.height - self.num_mines:
+            self.status = Game.WON
+        return opened
+
+    def toggle_flag(self, x, y):
+        """Ставит или снимает флажок."""
+        if self.status == Game.PLAYING and self.board.in_bounds(x, y):
+            self.board.toggle_flag(x, y)
+
+
+def generate_board(width, height, num_mines, seed=None):
+    """Создает поле с расположением мин, заданным seed (случайным, если его нет)."""
+    if seed is None:
+        seed = new_seed()
+    board = Board.from_mines(width, height, generate_mines(width, height, num_mines, seed))
+    board.seed = seed
+    return board
+
+
+class BoardCache:
+    """Готовые поля по ключу (ширина, высота, мины, seed).
+
+    Хранятся байты нетронутого поля - мины и числа, - так что повторная
+    партия с тем же seed не генерирует поле заново, а копирует его. Если
+    клеток в кэше больше max_cells, вытесняются давно не нужные поля.
+    """
+
+    def __init__(self, max_cells=BOARD_CACHE_CELLS):
+        self.max_cells = max_cells
+        self.boards = OrderedDict()
+        self.cells = 0
+        self.hits = 0
+        self.misses = 0
+
+    def put(self, board, num_mines):
+        """Запоминает только что созданное поле с известным seed."""
+        key = (board.width, board.height, num_mines, board.seed)
+        if key in self.boards:
+            self.boards.move_to_end(key)
+            return
+        self.boards[key] = bytes(board.cells)
+        self.cells += len(board.cells)
+        while self.cells > self.max_cells and len(self.boards) > 1:
+            self.cells -= len(self.boards.popitem(last=False)[1])
+
+    def board(self, width, height, num_mines, seed):
+        """Возвращает новую копию поля, создавая его только при промахе."""
+        key = (width, height, num_mines, seed)
+        cells = self.boards.get(key)
+        if cells is None:
+            self.misses += 1
+            board = generate_board(width, height, num_mines, seed)
+            self.put(board, num_mines)
+            return board
+        self.hits += 1
+        self.boards.move_to_end(key)
+        board = Board(width, height)
+        board.cells[:] = cells
+        board.seed = seed
+        return board
+
+
+def new_game(width, height, num_mines):
+    """Создает новую партию со случайным расположением мин."""
+    return Game(generate_board(width, height, num_mines), num_mines)
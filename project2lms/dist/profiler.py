@@ -0,0 +1,123 @@
+"""Замер времени по фазам кадра.
+
+Профилировщик выключен, пока не задана переменная окружения
+MINESWEEPER_PROFILE или флаг --profile. Значение - файл, куда при выходе
+записывается трасса: .json или .csv.
+"""
+import csv
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+PROFILE_ENV = 'MINESWEEPER_PROFILE'
+DEFAULT_TRACE = 'profile_trace.csv'
+HISTORY = 600
+TRACE_LIMIT = 200000
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(sorted_values, p):
+    """Значение p-го процентиля отсортированного списка."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, len(sorted_values) * p // 100)]
+
+
+class FrameProfiler:
+    """Скользящие окна времени фаз кадра и трасса для сохранения.
+
+    Для каждой фазы хранятся последние history замеров в миллисекундах.
+    Замеры приходят и из потока записи рекордов, поэтому трасса
+    пополняется под блокировкой.
+    """
+
+    def __init__(self, trace_path=None, history=HISTORY):
+        self.trace_path = trace_path
+        self.history = history
+        self.samples = {}
+        self.trace = deque(maxlen=TRACE_LIMIT)
+        self.lock = threading.Lock()
+        self.frame = 0
+        self.frame_start = time.perf_counter()
+
+    @property
+    def enabled(self):
+        return self.trace_path is not None
+
+    def enable(self, trace_path=DEFAULT_TRACE):
+        self.trace_path = trace_path
+
+    def phase(self, name):
+        """Контекст, время которого записывается как фаза name."""
+        if self.trace_path is None:
+            return nullcontext()
+        return self._timed(name)
+
+    def timed(self, name):
+        """Декоратор: время каждого вызова функции записывается как фаза name."""
+        def decorator(function):
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.phase(name):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    @contextmanager
+    def _timed(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - start) * 1000)
+
+    def record(self, name, ms):
+        with self.lock:
+            samples = self.samples.get(name)
+            if samples is None:
+                samples = self.samples[name] = deque(maxlen=self.history)
+            samples.append(ms)
+            self.trace.append((self.frame, name, ms))
+
+    def end_frame(self):
+        """Записывает полное время кадра и начинает следующий."""
+        if self.trace_path is None:
+            return
+        now = time.perf_counter()
+        self.record('frame', (now - self.frame_start) * 1000)
+        self.frame += 1
+        self.frame_start = now
+
+    def summary(self):
+        """Список (фаза, число замеров, p50, p95, p99) по скользящим окнам."""
+        with self.lock:
+            windows = [(name, sorted(samples)) for name, samples in self.samples.items()]
+        return [(name, len(values)) + tuple(percentile(values, p) for p in PERCENTILES)
+                for name, values in sorted(windows)]
+
+    def dump(self, path=None):
+        """Сохраняет трассу в CSV или JSON, формат выбирается по расширению."""
+        path = path or self.trace_path
+        with self.lock:
+            trace = list(self.trace)
+        try:
+            with open(path, 'w', encoding='utf-8', newline='') as file:
+                if path.endswith('.json'):
+                    json.dump({
+                        "summary": [dict(zip(("phase", "count", "p50", "p95", "p99"), row))
+                                    for row in self.summary()],
+                        "trace": [{"frame": frame, "phase": name, "ms": ms} for frame, name, ms in trace],
+                    }, file, ensure_ascii=False, indent=1)
+                else:
+                    writer = csv.writer(file)
+                    writer.writerow(("frame", "phase", "ms"))
+                    writer.writerows((frame, name, f"{ms:.4f}") for frame, name, ms in trace)
+        except OSError as e:
+            print(f"Ошибка при сохранении трассы: {e}")
+
+
+profiler = FrameProfiler(os.environ.get(PROFILE_ENV) or None)
@@ -1,676 +1,2282 @@
-import pygame
-import random
-import sqlite3
-import time
-import os
-from datetime import datetime
-import sys
-
-sys.setrecursionlimit(2500)
-
-# Константы
-WIDTH, HEIGHT = 800, 600
-EASY_SIZE = (9, 9, 10)
-MEDIUM_SIZE = (16, 16, 40)
-HARD_SIZE = (30, 16, 99)
-MINE_COLORS = {
-    0: (0, 0, 0),
-    1: (0, 0, 255),
-    2: (0, 128, 0),
-    3: (255, 0, 0),
-    4: (0, 0, 128),
-    5: (128, 0, 0),
-    6: (0, 128, 128),
-    7: (0, 0, 0),
-    8: (128, 128, 128)
-}
-
-# Цвета
-WHITE = (255, 255, 255)
-BLACK = (0, 0, 0)
-RR = (125, 125, 125)
-GRAY = (180, 180, 180)
-DARK_GRAY = (135, 135, 135)
-LIGHT_GRAY = (230, 230, 230)
-RED = (255, 0, 0)
-GREEN = (30, 220, 30)
-BLUE = (0, 0, 255)
-COLORR = (100, 100, 255)
-
-# Загрузка изображений
-flag_image = pygame.image.load(os.path.join('flag.png'))
-mine_image = pygame.image.load(os.path.join('mine.png'))
-
-all_sprites = pygame.sprite.Group()
-
-
-class Bomb(pygame.sprite.Sprite):
-    image = mine_image
-
-    def __init__(self, all_sprites):
-        super().__init__(all_sprites)
-        self.image = Bomb.image
-        self.rect = self.image.get_rect()
-        self.rect.x = random.randrange(900)
-        self.rect.y = random.randrange(900)
-
-    def update(self):
-        self.rect = self.rect.move(random.randrange(3) - 1,
-                                   random.randrange(3) - 1)
-
-
-def create_db():
-    """Создает базу данных для хранения рекордов, если она не существует."""
-    try:
-        conn = sqlite3.connect('minesweeper_records.db')
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS records (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                player_name TEXT,
-                difficulty TEXT,
-                time INTEGER,
-                date TEXT
-            )
-        ''')
-
-        cursor.execute("PRAGMA table_info(records)")
-        columns = [column[1] for column in cursor.fetchall()]
-        if 'date' not in columns:
-            cursor.execute("ALTER TABLE records ADD COLUMN date TEXT")
-            conn.commit()
-
-        conn.commit()
-        return conn, cursor
-    except sqlite3.Error as e:
-        print(f"Ошибка при работе с базой данных: {e}")
-        return None, None
-
-
-def save_record(cursor, conn, name, difficulty, time):
-    """Сохраняет рекорд в базу данных."""
-    date = datetime.now().strftime("%d-%m-%Y %H:%M:%S")
-    try:
-        cursor.execute("INSERT INTO records (player_name, difficulty, time, date) VALUES (?, ?, ?, ?)",
-                       (name, difficulty, time, date))
-        conn.commit()
-    except sqlite3.Error as e:
-        print(f"Ошибка при сохранении рекорда: {e}")
-
-
-def load_records(cursor):
-    """Загружает рекорды из базы данных."""
-    try:
-        cursor.execute("SELECT player_name, difficulty, time, date FROM records")
-        records = cursor.fetchall()
-        # Сортируем по уровню сложности, а затем по времени
-        records.sort(key=lambda record: (
-            {"Легкий": 0, "Средний": 1, "Сложный": 2, "Пользовательский": 3}[record[1]],
-            record[2]
-        ))
-        return records
-    except sqlite3.Error as e:
-        print(f"Ошибка при загрузке рекордов: {e}")
-        return []
-
-
-# --- Функции игры ---
-def generate_mines(width, height, num_mines):
-    """Генерирует случайные координаты мин."""
-    total_cells = width * height
-    if num_mines >= total_cells:
-        raise ValueError("Слишком много мин для поля!")
-    return random.sample(range(total_cells), num_mines)
-
-
-def get_cell_coords(index, width):
-    """Преобразует индекс в координаты клетки."""
-    return index % width, index // width
-
-
-def count_adjacent_mines(grid, x, y):
-    """Считает количество мин вокруг клетки (x, y)."""
-    count = 0
-    for i in range(max(0, x - 1), min(x + 2, len(grid[0]))):
-        for j in range(max(0, y - 1), min(y + 2, len(grid))):
-            if grid[j][i] == '*':
-                count += 1
-    return count
-
-
-def open_empty_cells(grid, revealed, x, y):
-    """Открывает пустые клетки рекурсивно."""
-    if not (0 <= x < len(grid[0]) and 0 <= y < len(grid)) or (x, y) in revealed:
-        return
-    revealed.add((x, y))
-    if grid[y][x] != 0:
-        return
-    for dx in [-1, 0, 1]:
-        for dy in [-1, 0, 1]:
-            if dx == 0 and dy == 0:
-                continue
-            open_empty_cells(grid, revealed, x + dx, y + dy)
-
-
-# --- Функции отрисовки ---
-def draw_grid(screen, grid, revealed, flagged, width, height, cell_size, game_over=False, mine_indices=[], offset_x=0,
-              offset_y=0, start_time=0, num_mines=0, flagged_count=0, conn=None, cursor=None, win=False,
-              game_active=True):
-    """Рисует игровое поле."""
-    for x in range(width):
-        for y in range(height):
-            rect = pygame.Rect(x * cell_size + offset_x, y * cell_size + offset_y, cell_size, cell_size)
-            cell_color = GRAY
-            if (x, y) in revealed and grid[y][x] != '*':
-                cell_color = DARK_GRAY
-            pygame.draw.rect(screen, cell_color, rect)
-            pygame.draw.rect(screen, LIGHT_GRAY, rect, 1)
-
-            if (x, y) in flagged:
-                # Рисуем флажок
-                screen.blit(pygame.transform.scale(flag_image, (cell_size, cell_size)),
-                            (x * cell_size + offset_x, y * cell_size + offset_y))
-                # Если игра окончена и флаг на мине - оставляем как есть
-                if game_over and (x, y) not in [get_cell_coords(index, width) for index in mine_indices]:
-                    # Рисуем перечеркнутый флаг если флаг не на мине
-                    pygame.draw.line(screen, BLACK, (x * cell_size + offset_x, y * cell_size + offset_y),
-                                     ((x + 1) * cell_size + offset_x, (y + 1) * cell_size + offset_y), 3)
-                    pygame.draw.line(screen, BLACK, ((x + 1) * cell_size + offset_x, y * cell_size + offset_y),
-                                     (x * cell_size + offset_x, (y + 1) * cell_size + offset_y), 3)
-
-            elif (x, y) in revealed:
-                if grid[y][x] == '*':
-                    # Рисуем мину если открыли
-                    screen.blit(pygame.transform.scale(mine_image, (cell_size, cell_size)),
-                                (x * cell_size + offset_x, y * cell_size + offset_y))
-                else:
-                    if grid[y][x] != 0:
-                        font_size = int(cell_size * 1)
-                        font = pygame.font.Font(None, font_size)
-                        text = font.render(str(grid[y][x]), True, MINE_COLORS[grid[y][x]])
-                        text_rect = text.get_rect(center=rect.center)
-                        screen.blit(text, text_rect)
-            # Показываем все мины, если игра окончена и клетка не открыта
-            elif game_over and (x, y) in [get_cell_coords(index, width) for index in mine_indices]:
-                mine_size = int(cell_size * 0.9)
-                mine_offset = (cell_size - mine_size) // 2
-                screen.blit(pygame.transform.scale(mine_image, (mine_size, mine_size)),
-                            (x * cell_size + offset_x + mine_offset, y * cell_size + offset_y + mine_offset))
-
-    # Отображение времени и оставшихся мин
-    font = pygame.font.Font(None, 30)
-    elapsed_time = int(time.time() - start_time)
-    mines_left = num_mines - flagged_count
-    time_text = font.render(f"Время: {elapsed_time} sec", True, BLACK)
-    mines_text = font.render(f"Мин осталось: {mines_left}", True, BLACK)
-    screen.blit(time_text, (30, screen.get_height() - 80))
-    screen.blit(mines_text, (screen.get_width() - 930, screen.get_height() - 40))
-
-    # Отрисовываем кнопки
-    button_width = 220
-    button_height = 30
-    button_y = screen.get_height() - 90
-    draw_button(screen, "Новая игра", 340, button_y, button_width, button_height, GRAY, COLORR,
-                lambda: start_game(screen, conn, cursor, width, height, num_mines), game_active)
-    draw_button(screen, "Изменить сложность", screen.get_width() - button_width - 400, button_y + 40, button_width,
-                button_height, GRAY, COLORR, lambda: main_menu(), game_active)
-
-    pygame.display.flip()
-
-
-def draw_button(screen, text, x, y, width, height, color, hover_color, action, game_active=True):
-    """Рисует кнопку."""
-    mouse = pygame.mouse.get_pos()
-    click = pygame.mouse.get_pressed()
-    rect = pygame.Rect(x, y, width, height)
-    color = hover_color if rect.collidepoint(mouse) else color
-    pygame.draw.rect(screen, color, rect)
-    font = pygame.font.Font(None, 30)
-    text_surf = font.render(text, True, BLACK)
-    text_rect = text_surf.get_rect(center=rect.center)
-    screen.blit(text_surf, text_rect)
-    if rect.collidepoint(mouse) and click[0] == 1:
-        action()
-
-
-def show_end_screen(screen, message, grid, revealed, flagged, width, height, cell_size, mine_indices, offset_x,
-                    offset_y, start_time, num_mines, flag, conn, cursor):
-    """Отображает экран окончания игры с рамкой вокруг текста."""
-    screen.fill(LIGHT_GRAY)
-    draw_grid(screen, grid, revealed, flagged, width, height, cell_size, True, mine_indices, offset_x, offset_y,
-              start_time, num_mines, len(flagged), game_active=False)
-    font = pygame.font.Font(None, 28)
-    text_surf = font.render(message, True, GREEN if flag else RED)
-    text_rect = text_surf.get_rect(center=(screen.get_width() - 200, screen.get_height() - 80))
-    screen.blit(text_surf, text_rect)
-
-    if flag:
-        text_surf2 = font.render("Коснитесь здесь, чтобы ввести имя", True, RR)
-        text_rect2 = text_surf2.get_rect(center=(screen.get_width() - 200, screen.get_height() - 40))
-
-        padding = 10
-        frame_rect = text_rect2.inflate(padding * 2, padding * 2)
-
-        pygame.draw.rect(screen, BLACK, frame_rect, 2)
-
-
-        screen.blit(text_surf2, text_rect2)
-
-
-    game_active = False
-
-    button_width = 220
-    button_height = 30
-    button_y = screen.get_height() - 90
-    button_rect_1 = pygame.Rect(340, button_y, button_width, button_height)
-    button_rect_2 = pygame.Rect(screen.get_width() - button_width - 400, button_y + 40, button_width, button_height)
-    draw_button(screen, "Новая игра", 340, button_y, button_width, button_height, GRAY, COLORR,
-                lambda: start_game(screen, conn, cursor, width, height, num_mines), game_active)
-    draw_button(screen, "Изменить сложность", screen.get_width() - button_width - 400, button_y + 40, button_width,
-                button_height, GRAY, COLORR, lambda: main_menu(), game_active)
-
-
-    pygame.display.flip()
-
-    if flag:
-        while True:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    return False
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    if text_rect2.collidepoint(event.pos) and event.button == 1:
-                        return
-                    if event.button == 1 and button_rect_1.collidepoint(event.pos):
-                        start_game(screen, conn, cursor, width, height, num_mines)
-                        return
-                    if event.button == 1 and button_rect_2.collidepoint(event.pos):
-                        main_menu()
-                        return
-    else:
-        while True:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    return False
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    if event.button == 1 and button_rect_1.collidepoint(event.pos):
-                        start_game(screen, conn, cursor, width, height, num_mines)
-                        return
-                    if event.button == 1 and button_rect_2.collidepoint(event.pos):
-                        main_menu()
-                        return
-
-def get_player_name(screen):
-    """Открывает окно ввода имени игрока."""
-    font = pygame.font.Font(None, 30)
-    input_box = pygame.Rect(screen.get_width() // 2 - 100, screen.get_height() // 2 - 20, 200, 40)
-    color_inactive = DARK_GRAY
-    color_active = GRAY
-    color = color_inactive
-    active = False
-    text = ''
-    done = False
-
-    prompt_font = pygame.font.Font(None, 28)
-    prompt_text = prompt_font.render("Введите имя:", True, BLACK)
-    prompt_rect = prompt_text.get_rect(center=(screen.get_width() // 2, screen.get_height() // 2 - 60))
-
-    while not done:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                return None
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                if input_box.collidepoint(event.pos):
-                    active = not active
-                else:
-                    active = False
-                color = color_active if active else color_inactive
-            if event.type == pygame.KEYDOWN:
-                if active:
-                    if event.key == pygame.K_RETURN:
-                        done = True
-                    elif event.key == pygame.K_BACKSPACE:
-                        text = text[:-1]
-                    else:
-                        text += event.unicode
-
-        screen.fill(LIGHT_GRAY)
-        screen.blit(prompt_text, prompt_rect)
-        txt_surface = font.render(text, True, BLACK)
-        width = max(200, txt_surface.get_width() + 10)
-        input_box.w = width
-        pygame.draw.rect(screen, color, input_box, 2)
-        screen.blit(txt_surface, (input_box.x + 5, input_box.y + 5))
-        pygame.display.flip()
-    if text:
-        return text
-    return None
-
-
-# --- Функции игрового процесса ---
-def play_game(screen, width, height, num_mines, cell_size, offset_x, offset_y, conn, cursor):
-    """Основная функция игры."""
-    grid = [[0 for _ in range(width)] for _ in range(height)]
-    mine_indices = generate_mines(width, height, num_mines)
-    for index in mine_indices:
-        x, y = get_cell_coords(index, width)
-        grid[y][x] = '*'
-    for y in range(height):
-        for x in range(width):
-            if grid[y][x] != '*':
-                grid[y][x] = count_adjacent_mines(grid, x, y)
-    revealed = set()
-    flagged = set()
-    start_time = time.time()
-    running = True
-    game_over = False
-    win = False
-    game_active = True
-    while running:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-                return None, None, False, grid, revealed, flagged, cell_size, mine_indices, offset_x, offset_y, start_time, num_mines, None
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                if not game_active:
-                    continue  # Остаемся в игровом окне при нажатии не на кнопки
-                x, y = event.pos
-                cell_x = (x - offset_x) // cell_size
-                cell_y = (y - offset_y) // cell_size
-                if event.button == 1:  # Левая кнопка
-                    if ((cell_x, cell_y) in [get_cell_coords(i, width) for i in mine_indices] and
-                            (cell_x, cell_y) not in flagged):
-                        game_over = True
-                        running = False
-                        win = False
-                        game_active = False
-                        break
-                    elif (cell_x, cell_y) not in revealed and (cell_x, cell_y) not in flagged:
-                        open_empty_cells(grid, revealed, cell_x, cell_y)
-                elif event.button == 3:  # Правая кнопка
-                    if (cell_x, cell_y) not in revealed:
-                        if (cell_x, cell_y) in flagged:
-                            flagged.remove((cell_x, cell_y))
-                        else:
-                            flagged.add((cell_x, cell_y))
-        screen.fill(WHITE)
-        draw_grid(screen, grid, revealed, flagged, width, height, cell_size, offset_x=offset_x, offset_y=offset_y,
-                  start_time=start_time, num_mines=num_mines, flagged_count=len(flagged), conn=conn, cursor=cursor,
-                  game_over=game_over, win=win, game_active=game_active)
-        pygame.display.flip()
-        if len(revealed) == width * height - num_mines and not game_over:
-            end_time = time.time()
-            elapsed_time = int(end_time - start_time)
-            print("You Win! Time:", elapsed_time)
-            running = False
-            win = True
-            game_active = False
-            break
-    if game_over:
-        flag = 0
-        return "Игра окончена! Вы проиграли", None, False, grid, revealed, flagged, cell_size, mine_indices, offset_x, offset_y, start_time, num_mines, flag
-    elif win:
-        flag = 1
-        return "Поздравляем! Вы выиграли", elapsed_time, True, grid, revealed, flagged, cell_size, mine_indices, offset_x, offset_y, start_time, num_mines, flag
-    return None, None, False, None, None, None, None, None, None, None, None, None, False
-
-
-def show_highscores(screen, cursor, records):
-    """Показывает таблицу рекордов."""
-    screen.fill(LIGHT_GRAY)
-    font = pygame.font.Font(None, 24)
-    y = 50
-
-    # Разделение рекордов по сложности
-    easy_records = [rec for rec in records if rec[1] == "Легкий"]
-    medium_records = [rec for rec in records if rec[1] == "Средний"]
-    hard_records = [rec for rec in records if rec[1] == "Сложный"]
-    custom_records = [rec for rec in records if rec[1] == "Пользовательский"]
-
-    # Отображение рекордов с заголовками
-    y = display_records(screen, "Легкий", easy_records, y, font)
-    y = display_records(screen, "Средний", medium_records, y, font)
-    y = display_records(screen, "Сложный", hard_records, y, font)
-    y = display_records(screen, "Пользовательский", custom_records, y, font)
-
-    # Кнопка "Назад"
-    button_width = 120
-    button_height = 30
-    button_x = screen.get_width() // 2 - button_width // 2
-    button_y = screen.get_height() - button_height - 20
-    back_button_rect = pygame.Rect(button_x, button_y, button_width, button_height)
-
-
-    running = True
-    while running:
-        mouse = pygame.mouse.get_pos()
-
-        if back_button_rect.collidepoint(mouse):
-            back_button_color = COLORR
-        else:
-            back_button_color = DARK_GRAY
-
-        draw_button(screen, "Назад", button_x, button_y, button_width, button_height, back_button_color, COLORR,
-                    main_menu, False)
-
-        pygame.display.flip()
-
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                return
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                if event.button == 1 and back_button_rect.collidepoint(event.pos):
-                    running = False
-                    return
-
-def display_records(screen, difficulty, records, start_y, font):
-    """Отображает рекорды для заданной сложности."""
-    y = start_y
-    text = font.render(f"{difficulty}:", True, BLACK)
-    screen.blit(text, (50, y))
-    # Получаем координаты текста
-    text_rect = text.get_rect(topleft=(50, y))
-    # Рисуем подчеркивание под текстом
-    pygame.draw.line(screen, BLACK, (text_rect.left, text_rect.bottom + 2), (text_rect.right, text_rect.bottom + 2), 2)
-    y += 30
-    for name, diff, time, date in records:
-        text = font.render(f"{name} - {time} сек - {date}", True, BLACK)
-        screen.blit(text, (70, y))
-        y += 25
-    return y + 10
-
-
-def main_menu():
-    """Главное меню."""
-    pygame.init()
-    side = int(max(WIDTH, HEIGHT) * 1.2)
-    screen = pygame.display.set_mode((side, side))
-    pygame.display.set_caption("Сапер")
-    conn, cursor = create_db()
-    if conn is None:
-        return
-    button_width = 200
-    button_height = 40
-    button_x = side // 2 - button_width // 2
-    button_y_start = int(side / 2.2)
-
-    # Создаем экземпляры Bomb с координатами под кнопками
-    all_sprites.empty()
-    for i in range(50):
-        Bomb(all_sprites)
-
-    running = True
-    font_author = pygame.font.Font(None, 26)
-    font_version = pygame.font.Font(None, 26
-
-                                    )
-
-    while running:
-        screen.fill(LIGHT_GRAY)
-        all_sprites.draw(screen)
-        all_sprites.update()
-
-        # Надпись об авторах
-        authors_text = font_author.render("Created by: Бородина Катя, Попов Сережа", True, BLACK)
-        authors_rect = authors_text.get_rect(bottomleft=(10, side - 30))  # Отступ для первой надписи
-        screen.blit(authors_text, authors_rect)
-
-        # Надпись о версии
-        version_text = font_version.render("Version: 1.0", True, BLACK)
-        version_rect = version_text.get_rect(bottomleft=(10, side - 10))  # Отступ для второй надписи
-        screen.blit(version_text, version_rect)
-
-        draw_button(screen, "Легкий", button_x, button_y_start, button_width, button_height, DARK_GRAY, COLORR,
-                    lambda: start_game(screen, conn, cursor, *EASY_SIZE))
-        draw_button(screen, "Средний", button_x, button_y_start + 50, button_width, button_height, DARK_GRAY, COLORR,
-                    lambda: start_game(screen, conn, cursor, *MEDIUM_SIZE))
-        draw_button(screen, "Сложный", button_x, button_y_start + 100, button_width, button_height, DARK_GRAY, COLORR,
-                    lambda: start_game(screen, conn, cursor, *HARD_SIZE))
-        draw_button(screen, "Пользовательский", button_x, button_y_start + 150, button_width, button_height,
-                    DARK_GRAY, COLORR, lambda: custom_game_settings(screen, conn, cursor))
-        draw_button(screen, "Таблица рекордов", button_x, button_y_start + 200, button_width, button_height,
-                    DARK_GRAY, COLORR, lambda: show_highscores(screen, cursor, load_records(cursor)))
-        pygame.display.flip()
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-    pygame.quit()
-    conn.close()
-
-def start_game(screen, conn, cursor, width, height, num_mines):
-    """Запускает игру с выбранными параметрами."""
-    pygame.init()
-    side = int(max(WIDTH, HEIGHT) * 1.2)
-    if (width, height, num_mines) == HARD_SIZE:
-        screen = pygame.display.set_mode((side, side))
-        cell_size = min(side // (width + 2), side // (height + 2))
-        offset_x = (side - cell_size * width) // 2
-        offset_y = (side - cell_size * height) // 2
-    else:
-        screen = pygame.display.set_mode((side, int(side * 0.9)))
-        cell_size = min(side // width, (int(side * 0.9) - 100) // height)
-        offset_x = (side - cell_size * width) // 2
-        offset_y = (int(side * 0.9) - cell_size * height - 100) // 2
-    message, elapsed_time, win, grid, revealed, flagged, cell_size, mine_indices, offset_x, offset_y, start_time, num_mines, flag = play_game(
-        screen, width, height, num_mines, cell_size, offset_x, offset_y, conn=conn, cursor=cursor)
-    if message is not None:
-        show_end_screen(screen, message, grid, revealed, flagged, width, height, cell_size, mine_indices, offset_x,
-                        offset_y, start_time, num_mines, flag, conn, cursor)
-        if win:
-            name = get_player_name(screen)
-            if name:
-                if (width, height, num_mines) == EASY_SIZE:
-                    difficulty = "Легкий"
-                elif (width, height, num_mines) == MEDIUM_SIZE:
-                    difficulty = "Средний"
-                elif (width, height, num_mines) == HARD_SIZE:
-                    difficulty = "Сложный"
-                else:
-                     difficulty = "Пользовательский"
-
-                save_record(cursor, conn, name, difficulty, elapsed_time)
-
-
-def custom_game_settings(screen, conn, cursor):
-    """Запускает меню пользовательских настроек."""
-    pygame.init()
-    font = pygame.font.Font(None, 30)
-    input_boxes = {
-        "Ширина": pygame.Rect(screen.get_width() // 2 - 100, screen.get_height() // 2 - 120, 200, 40),
-        "Высота": pygame.Rect(screen.get_width() // 2 - 100, screen.get_height() // 2 - 60, 200, 40),
-        "Кол-во мин": pygame.Rect(screen.get_width() // 2 - 100, screen.get_height() // 2, 200, 40)
-    }
-
-    text_inputs = {
-        "Ширина": "",
-        "Высота": "",
-        "Кол-во мин": ""
-    }
-
-    active_box = None
-    color_inactive = DARK_GRAY
-    color_active = GRAY
-    done = False
-
-    back_button_rect = pygame.Rect(screen.get_width() // 2 - 60, screen.get_height() - 50, 120, 30)
-
-    while not done:
-
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                return
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                if back_button_rect.collidepoint(event.pos) and event.button == 1:
-                    return
-                active_box = None
-                for key, rect in input_boxes.items():
-                    if rect.collidepoint(event.pos):
-                        active_box = key
-                        break
-            if event.type == pygame.KEYDOWN:
-                if active_box:
-                    if event.key == pygame.K_RETURN:
-                        try:
-                            width = int(text_inputs["Ширина"]) if text_inputs["Ширина"] != "" else 0
-                            height = int(text_inputs["Высота"]) if text_inputs["Высота"] != "" else 0
-                            num_mines = int(text_inputs["Кол-во мин"]) if text_inputs["Кол-во мин"] != "" else 0
-                            if 5 <= width <= 40 and 5 <= height <= 40 and 1 <= num_mines < width * height:
-                                done = True
-                                start_game(screen, conn, cursor, width, height, num_mines)
-                            else:
-                                print("Некорректные данные")
-                                text_inputs = {
-                                    "Ширина": "",
-                                    "Высота": "",
-                                    "Кол-во мин": ""
-                                }
-                        except ValueError:
-                            print("Введите целые числа")
-                            text_inputs = {
-                                "Ширина": "",
-                                "Высота": "",
-                                "Кол-во мин": ""
-                            }
-                    elif event.key == pygame.K_BACKSPACE:
-                        text_inputs[active_box] = text_inputs[active_box][:-1]
-                    elif event.unicode.isdigit():
-                        text_inputs[active_box] += event.unicode
-
-        screen.fill(LIGHT_GRAY)
-
-        # Надпись с инструкцией
-        instruction_font = pygame.font.Font(None, 24)
-        instruction_text  = "Кликните на поле ввода и введите цифры, затем нажмите 'Enter'\n" \
-                           "Ширина и высота: от 5 до 40.\n" \
-                           "Кол-во мин: от 1 до (ширина * высота - 1)."
-
-        y_offset = screen.get_height() // 2 - 250
-        for line in instruction_text.split('\n'):
-            instruction_line = instruction_font.render(line, True, BLACK)
-            instruction_rect = instruction_line.get_rect(center=(screen.get_width() // 2, y_offset))
-            screen.blit(instruction_line, instruction_rect)
-            y_offset += instruction_line.get_height()
-
-        for key, rect in input_boxes.items():
-            color = color_active if active_box == key else color_inactive
-            txt_surface = font.render(text_inputs[key], True, BLACK)
-            width = max(200, txt_surface.get_width() + 10)
-            input_boxes[key].w = width
-            pygame.draw.rect(screen, color, input_boxes[key], 2)
-            screen.blit(txt_surface, (input_boxes[key].x + 5, input_boxes[key].y + 5))
-
-            label_surface = font.render(key, True, BLACK)
-            label_rect = label_surface.get_rect(bottom=input_boxes[key].top - 5, left=input_boxes[key].left)
-            screen.blit(label_surface, label_rect)
-
-        # Кнопка "Назад"
-        button_width = 120
-        button_height = 30
-        button_x = screen.get_width() // 2 - button_width // 2
-        button_y = screen.get_height() - button_height - 20
-        draw_button(screen, "Назад", button_x, button_y, button_width, button_height, DARK_GRAY, COLORR, lambda: None,
-                    False)
-        pygame.display.flip()
-
-
-if __name__ == "__main__":
-    main_menu()
\ No newline at end of file
+import time
+
+# Холодный запуск отсчитывается до импорта pygame
+LAUNCH_TIME = time.perf_counter()
+
+import argparse
+import base64
+import csv
+import json
+import multiprocessing
+import pygame
+import queue
+import random
+import sqlite3
+import threading
+import os
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from datetime import date, datetime
+from itertools import islice
+
+from game_logic import (DAILY_NAME, DAILY_SIZE, EASY_SIZE, HARD_SIZE, MEDIUM_SIZE, REVEAL_BATCH, Board,
+                        BoardCache, Game, LazyBoard, daily_date, daily_difficulty, daily_seed, difficulty_name,
+                        generate_board, get_cell_coords, new_seed)
+from profiler import DEFAULT_TRACE, HISTORY, percentile, profiler
+from replay import FLAG, REVEAL, ReplayRecorder, board_size, decode
+from solver import MAX_SOLVER_CELLS, NoGuessGame, find_hint
+
+# Константы
+WIDTH, HEIGHT = 800, 600
+FPS = 60
+IDLE_TIMEOUT = 1000
+DIFFICULTIES = ("Легкий", "Средний", "Сложный", "Пользовательский")
+DB_PATH = 'minesweeper_records.db'
+# Картинки лежат рядом с модулем, а не в текущем каталоге
+ASSET_DIR = os.path.dirname(os.path.abspath(__file__))
+RECORD_FLUSH_INTERVAL = 0.5
+RECORDS_PAGE_SIZE = 100
+# За сколько последних дней считается среднее число игр в день
+STATS_DAYS = 30
+# Сколько строк вставляется одним executemany при импорте
+IMPORT_CHUNK = 10000
+RECORD_FIELDS = ("player_name", "difficulty", "time", "date", "replay", "seed")
+ROW_CACHE_SIZE = 512
+POOL_DEPTH = 2
+POOL_WORKERS = 2
+OVERLAY_INTERVAL = 0.25
+REPLAY_SPEED = 4
+# Камера: куски поля, масштаб и прокрутка
+CHUNK_CELLS = 16
+# Сколько пикселей кусков поля держать в кэше (по 4 байта на пиксель)
+CHUNK_CACHE_PIXELS = 16 * 1024 * 1024
+MIN_CELL_SIZE = 8
+MAX_CELL_SIZE = 60
+ZOOM_STEP = 1.25
+PAN_STEP = 0.25
+MIN_FIT_CELL_SIZE = 16
+SCROLL_CELL_SIZE = 24
+MAX_CUSTOM_SIDE = 10000
+LAZY_BOARD_CELLS = 250000
+# Сколько секунд кадра можно тратить на открытие большой пустой области
+REVEAL_FRAME_TIME = 0.008
+# Сторона ячейки сетки, по которой ищутся виджеты под курсором
+HIT_GRID_CELL = 64
+MINE_COLORS = {
+    0: (0, 0, 0),
+    1: (0, 0, 255),
+    2: (0, 128, 0),
+    3: (255, 0, 0),
+    4: (0, 0, 128),
+    5: (128, 0, 0),
+    6: (0, 128, 128),
+    7: (0, 0, 0),
+    8: (128, 128, 128)
+}
+
+# Цвета
+WHITE = (255, 255, 255)
+BLACK = (0, 0, 0)
+RR = (125, 125, 125)
+GRAY = (180, 180, 180)
+DARK_GRAY = (135, 135, 135)
+LIGHT_GRAY = (230, 230, 230)
+RED = (255, 0, 0)
+GREEN = (30, 220, 30)
+BLUE = (0, 0, 255)
+COLORR = (100, 100, 255)
+
+BOMB_STEPS = (-1, 0, 1)
+
+
+class AssetCache:
+    """Шрифты, надписи и картинки, подготовленные под текущий размер клетки.
+
+    Цифры, флажок и мина масштабируются один раз в set_cell_size, а не для
+    каждой клетки в каждом кадре. Картинки загружаются при первом обращении,
+    когда окно уже создано, и сразу переводятся в формат экрана.
+    """
+
+    def __init__(self):
+        self.images = {}
+        self.cell_size = None
+        self.digits = {}
+        self.flag = None
+        self.mine = None
+        self.small_mine = None
+        self.closed_cell = None
+        self.open_cell = None
+        self.fonts = {}
+        self.labels = {}
+
+    def set_cell_size(self, cell_size):
+        """Готовит картинки клеток под новый размер, если он изменился."""
+        if cell_size == self.cell_size:
+            return
+        self.cell_size = cell_size
+        font = self.font(int(cell_size * 1))
+        self.digits = {value: font.render(str(value), True, MINE_COLORS[value]) for value in range(1, 9)}
+        self.flag = pygame.transform.scale(self.image('flag.png'), (cell_size, cell_size))
+        self.mine = pygame.transform.scale(self.image('mine.png'), (cell_size, cell_size))
+        mine_size = int(cell_size * 0.9)
+        self.small_mine = pygame.transform.scale(self.image('mine.png'), (mine_size, mine_size))
+        self.closed_cell = self._cell_tile(GRAY)
+        self.open_cell = self._cell_tile(DARK_GRAY)
+
+    def _cell_tile(self, color):
+        tile = pygame.Surface((self.cell_size, self.cell_size))
+        tile.fill(color)
+        pygame.draw.rect(tile, LIGHT_GRAY, tile.get_rect(), 1)
+        return tile
+
+    def image(self, name):
+        """Возвращает картинку из ASSET_DIR в формате экрана, загружая ее один раз."""
+        if name not in self.images:
+            self.images[name] = pygame.image.load(os.path.join(ASSET_DIR, name)).convert_alpha()
+        return self.images[name]
+
+    def font(self, size):
+        """Возвращает шрифт нужного размера, создавая его один раз."""
+        if size not in self.fonts:
+            self.fonts[size] = pygame.font.Font(None, size)
+        return self.fonts[size]
+
+    def label(self, text, size=30, color=BLACK):
+        """Возвращает отрисованную надпись, например текст кнопки."""
+        key = (text, size, color)
+        if key not in self.labels:
+            self.labels[key] = self.font(size).render(text, True, color)
+        return self.labels[key]
+
+
+assets = AssetCache()
+
+# Время процессора, время работы и число кадров по экранам
+screen_stats = {}
+
+
+class LoopScheduler:
+    """Общий планировщик кадров для циклов экранов.
+
+    Ограничивает частоту кадров, а в режиме простоя ждет события вместо
+    постоянной перерисовки. Затраченное время процессора копится в
+    screen_stats под именем экрана.
+    """
+
+    def __init__(self, name, fps=FPS):
+        self.name = name
+        self.fps = fps
+        self.clock = pygame.time.Clock()
+        self.stats = screen_stats.setdefault(name, [0.0, 0.0, 0])
+        self.frames = 0
+        self.cpu_time = time.process_time()
+        self.wall_time = time.perf_counter()
+
+    def events(self, idle=False, timeout=IDLE_TIMEOUT):
+        """Ждет начала следующего кадра и возвращает накопившиеся события.
+
+        При idle=True кадр начинается только с приходом события или по
+        истечении timeout миллисекунд. Первый кадр экрана рисуется сразу.
+        """
+        if self.frames:
+            self.clock.tick(self.fps)
+        if idle and self.frames:
+            event = pygame.event.wait(max(1, timeout))
+            events = [] if event.type == pygame.NOEVENT else [event]
+            events += pygame.event.get()
+        else:
+            events = pygame.event.get()
+        cpu_time, wall_time = time.process_time(), time.perf_counter()
+        self.stats[0] += cpu_time - self.cpu_time
+        self.stats[1] += wall_time - self.wall_time
+        self.stats[2] += 1
+        self.frames += 1
+        self.cpu_time, self.wall_time = cpu_time, wall_time
+        return events
+
+
+def report_cpu_usage():
+    """Печатает загрузку процессора по экранам."""
+    for name, (cpu_time, wall_time, frames) in screen_stats.items():
+        if wall_time > 0:
+            print(f"{name}: CPU {cpu_time / wall_time:.1%}, {frames} кадров за {wall_time:.1f} сек")
+
+
+class BoardPool:
+    """Заранее генерирует поля в отдельных процессах.
+
+    Для каждого размера из sizes и для последнего пользовательского размера
+    держится очередь из depth полей. Если готового поля нет, оно создается
+    сразу, а промах учитывается в статистике. Выданные поля запоминаются в
+    cache, и поле с уже известным seed не генерируется повторно.
+    """
+
+    def __init__(self, sizes, depth=POOL_DEPTH, workers=POOL_WORKERS):
+        self.sizes = tuple(sizes)
+        self.depth = depth
+        self.queues = {}
+        self.stats = {}
+        self.custom = None
+        self.cache = BoardCache()
+        try:
+            self.executor = ProcessPoolExecutor(max_workers=workers)
+        except (OSError, NotImplementedError) as e:
+            print(f"Заготовка полей отключена: {e}")
+            self.executor = None
+        for size in self.sizes:
+            self.prepare(size)
+
+    def prepare(self, size):
+        """Дополняет очередь полей размера size до depth."""
+        if self.executor is None:
+            return
+        fields = self.queues.setdefault(size, deque())
+        try:
+            while len(fields) < self.depth:
+                # seed выбирается здесь, чтобы процессы не повторяли поля друг друга
+                fields.append(self.executor.submit(generate_board, *size, new_seed()))
+        except BrokenProcessPool as e:
+            self.disable(e)
+
+    def disable(self, error):
+        """Отключает заготовку после падения процесса; дальше поля создаются сразу в take."""
+        print(f"Заготовка полей отключена: {error}")
+        self.executor.shutdown(wait=False)
+        self.executor = None
+        self.queues.clear()
+
+    def take(self, size, seed=None):
+        """Возвращает поле размера (ширина, высота, мины), для seed - всегда одно и то же."""
+        if seed is not None:
+            return self.cache.board(*size, seed)
+        if size not in self.sizes and size != self.custom:
+            # Очередь держится только для последнего пользовательского размера
+            for future in self.queues.pop(self.custom, ()):
+                future.cancel()
+            self.custom = size
+        stats = self.stats.setdefault(size, [0, 0])
+        fields = self.queues.get(size)
+        board = None
+        if fields and fields[0].done() and not fields[0].cancelled():
+            try:
+                board = fields.popleft().result()
+                stats[0] += 1
+            except BrokenProcessPool as e:
+                self.disable(e)
+        if board is None:
+            board = generate_board(*size)
+            stats[1] += 1
+        self.prepare(size)
+        # Копия в кэше нетронутая: партия меняет клетки своего поля
+        self.cache.put(board, size[2])
+        return board
+
+    def report(self):
+        """Печатает число попаданий и промахов для каждого размера."""
+        for (width, height, num_mines), (hits, misses) in self.stats.items():
+            print(f"Поля {width}x{height}, {num_mines} мин: готовых {hits}, созданных сразу {misses}")
+        if self.cache.hits or self.cache.misses:
+            print(f"Поля с заданным seed: из кэша {self.cache.hits}, созданных {self.cache.misses}")
+
+    def close(self):
+        if self.executor is not None:
+            # Недоделанные поля создаются за миллисекунды, а без ожидания
+            # процессы могут завершаться уже после закрытия своих каналов
+            self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+class Bomb(pygame.sprite.Sprite):
+    def __init__(self, all_sprites):
+        super().__init__(all_sprites)
+        self.image = assets.image('mine.png')
+        self.rect = self.image.get_rect()
+        self.rect.x = random.randrange(900)
+        self.rect.y = random.randrange(900)
+
+
+class BombGroup(pygame.sprite.Group):
+    """Бомбы главного меню; сдвиги для всех бомб выбираются одним вызовом."""
+
+    def update(self):
+        sprites = self.sprites()
+        steps = random.choices(BOMB_STEPS, k=2 * len(sprites))
+        for sprite, dx, dy in zip(sprites, steps[::2], steps[1::2]):
+            sprite.rect.move_ip(dx, dy)
+
+
+all_sprites = BombGroup()
+
+
+def _create_records_table(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS records (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            player_name TEXT,
+            difficulty TEXT,
+            time INTEGER,
+            date TEXT
+        )
+    ''')
+    # В базах первой версии игры столбца date нет
+    cursor.execute("PRAGMA table_info(records)")
+    columns = [column[1] for column in cursor.fetchall()]
+    if 'date' not in columns:
+        cursor.execute("ALTER TABLE records ADD COLUMN date TEXT")
+
+
+def _create_records_index(cursor):
+    # Индекс для выборки лучших результатов каждой сложности
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_records_difficulty_time ON records (difficulty, time)")
+
+
+def _add_replay_column(cursor):
+    # Запись партии в формате модуля replay
+    cursor.execute("ALTER TABLE records ADD COLUMN replay BLOB")
+
+
+# День рекорда в виде ГГГГ-ММ-ДД из даты формата ДД-ММ-ГГГГ ЧЧ:ММ:СС
+RECORD_DAY = "substr({0}, 7, 4) || '-' || substr({0}, 4, 2) || '-' || substr({0}, 1, 2)"
+
+
+# Триггер, который пополняет сводные таблицы статистики при вставке рекорда
+STATS_TRIGGER = f"""
+    CREATE TRIGGER records_stats AFTER INSERT ON records
+    WHEN NEW.difficulty IS NOT NULL AND NEW.time IS NOT NULL
+    BEGIN
+        INSERT INTO time_histogram (difficulty, time, games) VALUES (NEW.difficulty, NEW.time, 1)
+            ON CONFLICT DO UPDATE SET games = games + 1;
+        INSERT INTO player_time_histogram (player_name, difficulty, time, games)
+            VALUES (coalesce(NEW.player_name, ''), NEW.difficulty, NEW.time, 1)
+            ON CONFLICT DO UPDATE SET games = games + 1;
+        INSERT INTO daily_games (day, difficulty, player_name, games)
+            SELECT {RECORD_DAY.format('NEW.date')}, NEW.difficulty, coalesce(NEW.player_name, ''), 1
+            WHERE NEW.date IS NOT NULL
+            ON CONFLICT DO UPDATE SET games = games + 1;
+    END
+"""
+
+
+def add_to_stats(cursor, after_id=0):
+    """Добавляет в сводные таблицы статистики рекорды с id больше after_id одним проходом."""
+    cursor.execute("""
+        INSERT INTO time_histogram (difficulty, time, games)
+        SELECT difficulty, time, COUNT(*) FROM records
+        WHERE id > ? AND difficulty IS NOT NULL AND time IS NOT NULL GROUP BY 1, 2
+        ON CONFLICT DO UPDATE SET games = games + excluded.games
+    """, (after_id,))
+    cursor.execute("""
+        INSERT INTO player_time_histogram (player_name, difficulty, time, games)
+        SELECT coalesce(player_name, ''), difficulty, time, COUNT(*) FROM records
+        WHERE id > ? AND difficulty IS NOT NULL AND time IS NOT NULL GROUP BY 1, 2, 3
+        ON CONFLICT DO UPDATE SET games = games + excluded.games
+    """, (after_id,))
+    cursor.execute(f"""
+        INSERT INTO daily_games (day, difficulty, player_name, games)
+        SELECT {RECORD_DAY.format('date')}, difficulty, coalesce(player_name, ''), COUNT(*) FROM records
+        WHERE id > ? AND difficulty IS NOT NULL AND time IS NOT NULL AND date IS NOT NULL GROUP BY 1, 2, 3
+        ON CONFLICT DO UPDATE SET games = games + excluded.games
+    """, (after_id,))
+
+
+def _create_stats_tables(cursor):
+    # Сводные таблицы для статистики: сколько раз встречалось каждое время у
+    # игрока и у сложности, и сколько игр было за день. Их пополняет триггер
+    # при вставке рекорда, поэтому статистика не читает всю таблицу records.
+    # Рекорды только добавляются, удаления триггер не учитывает.
+    cursor.execute("""
+        CREATE TABLE time_histogram (
+            difficulty TEXT NOT NULL,
+            time INTEGER NOT NULL,
+            games INTEGER NOT NULL,
+            PRIMARY KEY (difficulty, time)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+        CREATE TABLE player_time_histogram (
+            player_name TEXT NOT NULL,
+            difficulty TEXT NOT NULL,
+            time INTEGER NOT NULL,
+            games INTEGER NOT NULL,
+            PRIMARY KEY (player_name, difficulty, time)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+        CREATE TABLE daily_games (
+            day TEXT NOT NULL,
+            difficulty TEXT NOT NULL,
+            player_name TEXT NOT NULL,
+            games INTEGER NOT NULL,
+            PRIMARY KEY (day, difficulty, player_name)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("CREATE INDEX idx_daily_games_player ON daily_games (player_name, day)")
+    cursor.execute(STATS_TRIGGER)
+    # Рекорды, сохраненные до появления сводных таблиц
+    add_to_stats(cursor)
+
+
+def _create_records_key_index(cursor):
+    # Индекс для поиска совпадающих рекордов при импорте и слиянии баз
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_records_key ON records (player_name, difficulty, time, date)")
+
+
+def _add_seed_column(cursor):
+    # seed поля, на котором поставлен рекорд; у старых рекордов его нет
+    cursor.execute("ALTER TABLE records ADD COLUMN seed INTEGER")
+
+
+# Миграции схемы по порядку; номер версии базы хранится в PRAGMA user_version
+MIGRATIONS = (
+    _create_records_table,
+    _create_records_index,
+    _add_replay_column,
+    _create_stats_tables,
+    _create_records_key_index,
+    _add_seed_column,
+)
+
+# Соединение с базой рекордов, общее на все время работы программы
+db = None
+
+
+def migrate_db(conn):
+    """Применяет к базе миграции, которых в ней еще нет."""
+    cursor = conn.cursor()
+    version = cursor.execute("PRAGMA user_version").fetchone()[0]
+    for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        cursor.execute("BEGIN")
+        try:
+            migration(cursor)
+            cursor.execute(f"PRAGMA user_version = {number}")
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+
+
+def create_db():
+    """Открывает базу рекордов при первом вызове и возвращает общее соединение."""
+    global db
+    if db is not None:
+        return db
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        migrate_db(conn)
+        db = conn, conn.cursor()
+        return db
+    except sqlite3.Error as e:
+        print(f"Ошибка при работе с базой данных: {e}")
+        return None, None
+
+
+def close_db():
+    """Закрывает общее соединение с базой рекордов."""
+    global db
+    if db is not None:
+        db[0].close()
+        db = None
+
+
+class RecordWriter:
+    """Записывает рекорды в базу в отдельном потоке.
+
+    Поток берет рекорды из очереди и раз в interval секунд сохраняет все
+    накопившиеся одной транзакцией. Таблица рекордов перед показом
+    вызывает flush, чтобы в ней был и только что сохраненный рекорд.
+    """
+
+    def __init__(self, path=DB_PATH, interval=RECORD_FLUSH_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def put(self, record):
+        """Ставит рекорд (имя, сложность, время, дата, запись партии, seed) в очередь на запись."""
+        self.queue.put(record)
+
+    def flush(self):
+        """Ждет, пока все поставленные в очередь рекорды окажутся в базе."""
+        if not self.thread.is_alive():
+            # Поток записи не смог открыть базу, ждать некого
+            return
+        done = threading.Event()
+        self.queue.put(done)
+        done.wait()
+
+    def close(self):
+        """Записывает оставшиеся рекорды и останавливает поток."""
+        self.queue.put(None)
+        self.thread.join()
+
+    def _run(self):
+        # В очереди лежат рекорды-кортежи, Event от flush и None от close
+        try:
+            conn = sqlite3.connect(self.path)
+            conn.execute("PRAGMA synchronous = NORMAL")
+        except sqlite3.Error as e:
+            print(f"Ошибка при открытии базы для записи рекордов: {e}")
+            return
+        batch = []
+        deadline = 0.0
+        while True:
+            try:
+                item = self.queue.get(timeout=max(0.0, deadline - time.monotonic()) if batch else None)
+            except queue.Empty:
+                self._write(conn, batch)
+                batch = []
+                continue
+            if isinstance(item, tuple):
+                if not batch:
+                    deadline = time.monotonic() + self.interval
+                batch.append(item)
+                continue
+            if batch:
+                self._write(conn, batch)
+                batch = []
+            if item is None:
+                break
+            item.set()
+        conn.close()
+
+    @profiler.timed('db.write')
+    def _write(self, conn, batch):
+        try:
+            with conn:
+                conn.executemany("INSERT INTO records (player_name, difficulty, time, date, replay, seed) "
+                                 "VALUES (?, ?, ?, ?, ?, ?)", batch)
+        except sqlite3.Error as e:
+            print(f"Ошибка при сохранении рекорда: {e}")
+
+
+@profiler.timed('db.save_record')
+def save_record(writer, name, difficulty, time, replay=None, seed=None):
+    """Сохраняет рекорд в базу данных через фоновый поток записи."""
+    date = datetime.now().strftime("%d-%m-%Y %H:%M:%S")
+    writer.put((name, difficulty, time, date, replay, seed))
+
+
+@profiler.timed('db.count_records')
+def count_records(cursor, difficulty):
+    """Возвращает число рекордов заданной сложности."""
+    try:
+        cursor.execute("SELECT COUNT(*) FROM records WHERE difficulty = ?", (difficulty,))
+        return cursor.fetchone()[0]
+    except sqlite3.Error as e:
+        print(f"Ошибка при загрузке рекордов: {e}")
+        return 0
+
+
+@contextmanager
+def bulk_insert(conn):
+    """Транзакция для массовой вставки рекордов.
+
+    Построчный триггер статистики на это время снимается, а сводные таблицы
+    пополняются в конце одним проходом по новым рекордам: при миллионе строк
+    это в разы быстрее. При ошибке все, включая триггер, откатывается.
+    """
+    with conn:
+        conn.execute("BEGIN")
+        last_id = conn.execute("SELECT coalesce(MAX(id), 0) FROM records").fetchone()[0]
+        conn.execute("DROP TRIGGER records_stats")
+        yield
+        add_to_stats(conn, last_id)
+        conn.execute(STATS_TRIGGER)
+
+
+# Рекорд вставляется, только если в базе нет рекорда с тем же именем,
+# сложностью, временем и датой; IS сравнивает и пустые (NULL) значения
+INSERT_NEW_RECORD = """
+    INSERT INTO records (player_name, difficulty, time, date, replay, seed) SELECT ?1, ?2, ?3, ?4, ?5, ?6
+    WHERE NOT EXISTS (SELECT 1 FROM records
+                      WHERE player_name IS ?1 AND difficulty IS ?2 AND time IS ?3 AND date IS ?4)
+"""
+
+
+def _record_to_dict(row):
+    record = dict(zip(RECORD_FIELDS, row))
+    if record["replay"] is not None:
+        record["replay"] = base64.b64encode(record["replay"]).decode('ascii')
+    return record
+
+
+def _record_from_dict(record):
+    replay = record.get("replay")
+    seed = record.get("seed")
+    return (record.get("player_name"), record.get("difficulty"), int(record["time"]), record.get("date") or None,
+            base64.b64decode(replay) if replay else None, int(seed) if seed not in (None, "") else None)
+
+
+@profiler.timed('db.export_records')
+def export_records(cursor, path):
+    """Выгружает все рекорды в CSV или JSON Lines, формат выбирается по расширению.
+
+    Строки читаются из курсора по одной, так что память не зависит от
+    числа рекордов. Запись партии сохраняется в base64. Возвращает число
+    выгруженных рекордов.
+    """
+    count = 0
+    cursor.execute("SELECT player_name, difficulty, time, date, replay, seed FROM records ORDER BY id")
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        if path.endswith('.jsonl'):
+            for row in cursor:
+                file.write(json.dumps(_record_to_dict(row), ensure_ascii=False) + '\n')
+                count += 1
+        else:
+            writer = csv.DictWriter(file, RECORD_FIELDS)
+            writer.writeheader()
+            for row in cursor:
+                writer.writerow(_record_to_dict(row))
+                count += 1
+    return count
+
+
+def read_records(file, jsonl):
+    """Перебирает рекорды из открытого файла CSV или JSON Lines."""
+    if jsonl:
+        for line in file:
+            if line.strip():
+                yield _record_from_dict(json.loads(line))
+    else:
+        for record in csv.DictReader(file):
+            yield _record_from_dict(record)
+
+
+@profiler.timed('db.import_records')
+def import_records(conn, path, chunk=IMPORT_CHUNK):
+    """Загружает рекорды из CSV или JSON Lines одной транзакцией.
+
+    Файл читается потоком и вставляется кусками по chunk строк; рекорды,
+    которые уже есть в базе, пропускаются. Возвращает число добавленных.
+    """
+    added = 0
+    with open(path, encoding='utf-8', newline='') as file, bulk_insert(conn):
+        records = read_records(file, path.endswith('.jsonl'))
+        for rows in iter(lambda: list(islice(records, chunk)), []):
+            added += conn.executemany(INSERT_NEW_RECORD, rows).rowcount
+    return added
+
+
+@profiler.timed('db.merge_records')
+def merge_records(conn, path):
+    """Добавляет рекорды из другой базы, пропуская совпадающие.
+
+    База подключается через ATTACH, и рекорды переносятся одним запросом
+    внутри SQLite, не проходя через Python. Совпадающие рекорды внутри
+    другой базы тоже попадают в эту только один раз. Возвращает число
+    добавленных.
+    """
+    # ATTACH создал бы пустую базу на месте опечатки в пути
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"нет файла {path}")
+    conn.execute("ATTACH DATABASE ? AS other", (path,))
+    try:
+        # В базах старых версий игры может не быть столбцов date, replay и seed
+        columns = {column[1] for column in conn.execute("PRAGMA other.table_info(records)")}
+        if not columns:
+            raise sqlite3.OperationalError(f"в {path} нет таблицы records")
+        select = ", ".join(field if field in columns else "NULL" for field in RECORD_FIELDS)
+        with bulk_insert(conn):
+            added = conn.execute(f"""
+                INSERT INTO records (player_name, difficulty, time, date, replay, seed)
+                SELECT {select} FROM other.records AS o
+                WHERE NOT EXISTS (SELECT 1 FROM main.records AS r
+                                  WHERE r.player_name IS o.player_name AND r.difficulty IS o.difficulty
+                                  AND r.time IS o.time AND r.date IS {"o.date" if "date" in columns else "NULL"})
+                GROUP BY 1, 2, 3, 4
+            """).rowcount
+    finally:
+        conn.execute("DETACH DATABASE other")
+    return added
+
+
+def load_replay(cursor, record_id):
+    """Возвращает запись партии рекорда или None."""
+    try:
+        cursor.execute("SELECT replay FROM records WHERE id = ?", (record_id,))
+        row = cursor.fetchone()
+        return row[0] if row else None
+    except sqlite3.Error as e:
+        print(f"Ошибка при загрузке записи партии: {e}")
+        return None
+
+
+def load_record_board(cursor, record_id):
+    """Размер поля и seed рекорда (ширина, высота, мины, seed) или None, если поле не восстановить."""
+    try:
+        cursor.execute("SELECT seed, replay FROM records WHERE id = ?", (record_id,))
+        row = cursor.fetchone()
+    except sqlite3.Error as e:
+        print(f"Ошибка при загрузке рекорда: {e}")
+        return None
+    if row is None or row[0] is None or row[1] is None:
+        return None
+    try:
+        return board_size(row[1]) + (row[0],)
+    except ValueError:
+        return None
+
+
+def _histogram_stats(rows):
+    """Число игр, лучшее, среднее и медианное время по строкам (время, число игр, сумма с начала)."""
+    if not rows:
+        return 0, None, None, None
+    games = rows[-1][2]
+    total = sum(time * count for time, count, cumulative in rows)
+    # Медиана - среднее двух средних значений, при нечетном числе игр они совпадают
+    middle = [next(time for time, count, cumulative in rows if cumulative > position)
+              for position in ((games - 1) // 2, games // 2)]
+    return games, rows[0][0], total / games, sum(middle) / 2
+
+
+@profiler.timed('db.load_stats')
+def load_stats(cursor, difficulty, player_name=None, days=STATS_DAYS):
+    """Статистика сложности, а если задан player_name - статистика игрока.
+
+    Возвращает словарь с числом игр, лучшим, средним и медианным временем и
+    средним числом игр в день за последние days дней. Все считается по
+    сводным таблицам: строк в них столько, сколько разных значений времени
+    и дней, а не рекордов.
+    """
+    if player_name is None:
+        histogram = ("SELECT time, games, SUM(games) OVER (ORDER BY time) FROM time_histogram "
+                     "WHERE difficulty = ? ORDER BY time", (difficulty,))
+        daily = ("SELECT SUM(games) FROM daily_games WHERE day >= date('now', ?) AND difficulty = ?",
+                 (f"-{days - 1} days", difficulty))
+    else:
+        histogram = ("SELECT time, games, SUM(games) OVER (ORDER BY time) FROM player_time_histogram "
+                     "WHERE player_name = ? AND difficulty = ? ORDER BY time", (player_name, difficulty))
+        daily = ("SELECT SUM(games) FROM daily_games WHERE player_name = ? AND day >= date('now', ?) "
+                 "AND difficulty = ?", (player_name, f"-{days - 1} days", difficulty))
+    try:
+        cursor.execute(*histogram)
+        games, best, mean, median = _histogram_stats(cursor.fetchall())
+        cursor.execute(*daily)
+        recent = cursor.fetchone()[0] or 0
+    except sqlite3.Error as e:
+        print(f"Ошибка при загрузке статистики: {e}")
+        return None
+    return {"games": games, "best": best, "mean": mean, "median": median, "per_day": recent / days}
+
+
+def format_stats(stats):
+    """Статистика из load_stats одной строкой."""
+    return (f"Игр: {stats['games']}, лучшее: {stats['best']} сек, среднее: {stats['mean']:.1f} сек, "
+            f"медиана: {stats['median']:g} сек, в день: {stats['per_day']:.1f}")
+
+
+@profiler.timed('db.percentile_rank')
+def percentile_rank(cursor, difficulty, time):
+    """Возвращает, в какой доле лучших результатов сложности (в процентах) окажется time.
+
+    1 - лучший результат, 100 - худший. Время сравнивается с сохраненными
+    рекордами по сводной таблице, число прочитанных строк не больше числа
+    разных значений времени быстрее time.
+    """
+    try:
+        cursor.execute("SELECT coalesce(SUM(games), 0) FROM time_histogram WHERE difficulty = ? AND time < ?",
+                       (difficulty, time))
+        faster = cursor.fetchone()[0]
+        cursor.execute("SELECT coalesce(SUM(games), 0) FROM time_histogram WHERE difficulty = ?", (difficulty,))
+        total = cursor.fetchone()[0]
+    except sqlite3.Error as e:
+        print(f"Ошибка при загрузке статистики: {e}")
+        return None
+    # Новый результат еще не в базе, поэтому он добавляется к общему числу
+    return max(1, -(-(faster + 1) * 100 // (total + 1)))
+
+
+@profiler.timed('db.load_records_page')
+def load_records_page(cursor, difficulty, limit, after=None, before=None, from_end=False):
+    """Загружает страницу рекордов сложности, упорядоченных по (time, id).
+
+    after и before - ключ (time, id), после или до которого начинается
+    страница; from_end берет последнюю страницу. Строки (id, имя, сложность,
+    время, дата) всегда возвращаются по возрастанию ключа.
+    """
+    query = "SELECT id, player_name, difficulty, time, date FROM records WHERE difficulty = ?"
+    params = [difficulty]
+    if after is not None:
+        query += " AND (time, id) > (?, ?)"
+        params += after
+    if before is not None:
+        query += " AND (time, id) < (?, ?)"
+        params += before
+    descending = before is not None or from_end
+    query += " ORDER BY time DESC, id DESC LIMIT ?" if descending else " ORDER BY time, id LIMIT ?"
+    params.append(limit)
+    try:
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+    except sqlite3.Error as e:
+        print(f"Ошибка при загрузке рекордов: {e}")
+        return []
+    if descending:
+        rows.reverse()
+    return rows
+
+
+class RecordsPager:
+    """Окно рекордов одной сложности для прокрутки таблицы.
+
+    В памяти держится не больше max_pages страниц вокруг видимых строк.
+    Соседние страницы подгружаются по ключу (time, id) последней или
+    первой загруженной строки, без OFFSET.
+    """
+
+    def __init__(self, cursor, difficulty, page_size=RECORDS_PAGE_SIZE, max_pages=4):
+        self.cursor = cursor
+        self.difficulty = difficulty
+        self.page_size = page_size
+        self.max_rows = page_size * max_pages
+        self.total = count_records(cursor, difficulty)
+        self.rows = []
+        self.start = 0
+
+    def rows_at(self, first, count):
+        """Возвращает строки с номерами first..first + count - 1."""
+        end = min(first + count, self.total)
+        loaded_end = self.start + len(self.rows)
+        if first == 0 and self.start > 0:
+            # Переход в начало таблицы
+            self._reset(load_records_page(self.cursor, self.difficulty, self.page_size), 0)
+        elif end == self.total and end - loaded_end > self.page_size:
+            # Переход в конец таблицы
+            rows = load_records_page(self.cursor, self.difficulty, max(self.page_size, count), from_end=True)
+            self._reset(rows, self.total - len(rows))
+
+        while first < self.start:
+            page = load_records_page(self.cursor, self.difficulty, self.page_size, before=self._key(0))
+            if not page:
+                break
+            self.rows[:0] = page
+            self.start -= len(page)
+        while self.start + len(self.rows) < end:
+            after = self._key(-1) if self.rows else None
+            page = load_records_page(self.cursor, self.difficulty, self.page_size, after=after)
+            if not page:
+                self.total = self.start + len(self.rows)
+                break
+            self.rows += page
+
+        if len(self.rows) > self.max_rows:
+            low = max(0, first - self.page_size - self.start)
+            high = end + self.page_size - self.start
+            self.rows = self.rows[low:high]
+            self.start += low
+        return self.rows[max(0, first - self.start):max(0, end - self.start)]
+
+    def _key(self, index):
+        row = self.rows[index]
+        return row[3], row[0]
+
+    def _reset(self, rows, start):
+        self.rows = rows
+        self.start = start
+
+
+# --- Функции отрисовки ---
+class Camera:
+    """Видимая часть поля.
+
+    view - прямоугольник экрана, в котором рисуется поле, x и y - сдвиг
+    в пикселях поля, cell_size - текущий масштаб. Поле больше view можно
+    прокручивать и приближать. Клетки вписанного в окно поля бывают больше
+    MAX_CELL_SIZE, и к этому начальному размеру всегда можно вернуться.
+    """
+
+    def __init__(self, view, board_width, board_height, cell_size):
+        self.view = pygame.Rect(view)
+        self.board_width = board_width
+        self.board_height = board_height
+        self.cell_size = cell_size
+        self.max_cell_size = max(MAX_CELL_SIZE, cell_size)
+        self.x = 0
+        self.y = 0
+
+    @property
+    def state(self):
+        return self.x, self.y, self.cell_size
+
+    def clamp(self):
+        self.x = max(0, min(self.x, self.board_width * self.cell_size - self.view.width))
+        self.y = max(0, min(self.y, self.board_height * self.cell_size - self.view.height))
+
+    def pan(self, dx, dy):
+        """Сдвигает камеру на dx, dy пикселей."""
+        self.x += dx
+        self.y += dy
+        self.clamp()
+
+    def center_on(self, cell_x, cell_y):
+        self.x = cell_x * self.cell_size + self.cell_size // 2 - self.view.width // 2
+        self.y = cell_y * self.cell_size + self.cell_size // 2 - self.view.height // 2
+        self.clamp()
+
+    def zoom(self, steps, pos):
+        """Меняет масштаб так, чтобы точка поля под pos осталась на месте."""
+        cell_size = self.cell_size
+        for _ in range(abs(steps)):
+            cell_size = int(cell_size * ZOOM_STEP) + 1 if steps > 0 else int(cell_size / ZOOM_STEP)
+        cell_size = max(MIN_CELL_SIZE, min(cell_size, self.max_cell_size))
+        if cell_size == self.cell_size:
+            return
+        px = pos[0] - self.view.x + self.x
+        py = pos[1] - self.view.y + self.y
+        self.x = px * cell_size // self.cell_size - (pos[0] - self.view.x)
+        self.y = py * cell_size // self.cell_size - (pos[1] - self.view.y)
+        self.cell_size = cell_size
+        self.clamp()
+
+    def screen_to_cell(self, pos):
+        """Возвращает клетку (x, y) под точкой экрана или None."""
+        if not self.view.collidepoint(pos):
+            return None
+        return ((pos[0] - self.view.x + self.x) // self.cell_size,
+                (pos[1] - self.view.y + self.y) // self.cell_size)
+
+    def cell_rect(self, x, y):
+        """Прямоугольник клетки в координатах экрана."""
+        return pygame.Rect(self.view.x + x * self.cell_size - self.x, self.view.y + y * self.cell_size - self.y,
+                           self.cell_size, self.cell_size)
+
+
+class BoardRenderer:
+    """Отрисовывает видимую часть поля, перерисовывая только изменившиеся клетки.
+
+    Поле делится на куски по CHUNK_CELLS клеток в стороне. Каждый кусок
+    рисуется на своей поверхности и хранит копию своих клеток, по которой
+    находятся клетки, которые нужно обновить. Рисуются и проверяются только
+    куски, попавшие в камеру; недавние хранятся в кэше размером
+    CHUNK_CACHE_PIXELS.
+    """
+
+    def __init__(self, board, camera, background=WHITE):
+        self.board = board
+        self.camera = camera
+        self.background = background
+        self.chunks = OrderedDict()
+        self.chunk_cell_size = None
+        self.full_redraw = True
+        self.game_over = False
+        self.screen_size = None
+        self.camera_state = None
+        self.hud_state = None
+        self.hud_rects = []
+
+    def invalidate(self):
+        """Требует полной перерисовки экрана в следующем кадре."""
+        self.full_redraw = True
+
+    def invalidate_cell(self, index):
+        """Требует перерисовки одной клетки в следующем кадре."""
+        x, y = get_cell_coords(index, self.board.width)
+        chunk = self.chunks.get((x // CHUNK_CELLS, y // CHUNK_CELLS))
+        if chunk is not None:
+            surface, drawn, left, top, columns = chunk
+            # Такого байта у настоящей клетки не бывает
+            drawn[(y - top) * columns + x - left] = 0xFF
+
+    def cell_rect(self, index):
+        """Прямоугольник клетки в координатах экрана."""
+        return self.camera.cell_rect(*get_cell_coords(index, self.board.width))
+
+    def draw(self, screen, game_over=False):
+        """Обновляет поле на экране и возвращает список измененных областей."""
+        camera = self.camera
+        if camera.cell_size != self.chunk_cell_size or game_over != self.game_over:
+            self.chunks.clear()
+            self.chunk_cell_size = camera.cell_size
+            self.game_over = game_over
+            self.full_redraw = True
+        assets.set_cell_size(camera.cell_size)
+        full = self.full_redraw or screen.get_size() != self.screen_size or camera.state != self.camera_state
+        if full:
+            self.full_redraw = False
+            self.screen_size = screen.get_size()
+            self.camera_state = camera.state
+            self.hud_state = None
+            self.hud_rects = []
+            screen.fill(self.background)
+
+        view = camera.view
+        chunk_size = CHUNK_CELLS * camera.cell_size
+        first_x, first_y = camera.x // chunk_size, camera.y // chunk_size
+        last_x = min((camera.x + view.width - 1) // chunk_size, (self.board.width - 1) // CHUNK_CELLS)
+        last_y = min((camera.y + view.height - 1) // chunk_size, (self.board.height - 1) // CHUNK_CELLS)
+        dirty = []
+        screen.set_clip(view)
+        for chunk_y in range(first_y, last_y + 1):
+            for chunk_x in range(first_x, last_x + 1):
+                surface, changed = self._update_chunk(chunk_x, chunk_y)
+                position = (view.x + chunk_x * chunk_size - camera.x, view.y + chunk_y * chunk_size - camera.y)
+                if full or changed is None:
+                    area = screen.blit(surface, position)
+                    if not full:
+                        dirty.append(area)
+                    continue
+                for area in changed:
+                    dirty.append(screen.blit(surface, (position[0] + area.x, position[1] + area.y), area))
+        screen.set_clip(None)
+        # Видимые куски только что использованы и лежат в конце кэша
+        visible = (last_x - first_x + 1) * (last_y - first_y + 1)
+        while len(self.chunks) > max(visible, CHUNK_CACHE_PIXELS // (chunk_size * chunk_size)):
+            self.chunks.popitem(last=False)
+        return [screen.get_rect()] if full else dirty
+
+    def _update_chunk(self, chunk_x, chunk_y):
+        """Возвращает поверхность куска и области, перерисованные на ней."""
+        key = (chunk_x, chunk_y)
+        chunk = self.chunks.get(key)
+        board = self.board
+        width = board.width
+        cells = board.cells
+        cell_size = self.camera.cell_size
+        if chunk is None:
+            left, top = chunk_x * CHUNK_CELLS, chunk_y * CHUNK_CELLS
+            columns = min(CHUNK_CELLS, width - left)
+            rows = min(CHUNK_CELLS, board.height - top)
+            surface = pygame.Surface((columns * cell_size, rows * cell_size))
+            drawn = bytearray()
+            for row in range(rows):
+                start = (top + row) * width + left
+                drawn += cells[start:start + columns]
+            for offset, cell in enumerate(drawn):
+                self._draw_cell(surface, (offset % columns) * cell_size, (offset // columns) * cell_size, cell)
+            self.chunks[key] = (surface, drawn, left, top, columns)
+            return surface, None
+
+        self.chunks.move_to_end(key)
+        surface, drawn, left, top, columns = chunk
+        changed = []
+        for row in range(len(drawn) // columns):
+            start = (top + row) * width + left
+            current = cells[start:start + columns]
+            offset = row * columns
+            if current == drawn[offset:offset + columns]:
+                continue
+            for column, cell in enumerate(current):
+                if cell != drawn[offset + column]:
+                    changed.append(self._draw_cell(surface, column * cell_size, row * cell_size, cell))
+            drawn[offset:offset + columns] = current
+        return surface, changed
+
+    def draw_hud(self, screen, elapsed_time, mines_left):
+        """Обновляет надписи времени и оставшихся мин, если они изменились."""
+        if self.hud_state == (elapsed_time, mines_left):
+            return []
+        self.hud_state = (elapsed_time, mines_left)
+        dirty = self.hud_rects
+        for rect in dirty:
+            screen.fill(self.background, rect)
+        font = assets.font(30)
+        time_text = font.render(f"Время: {elapsed_time} sec", True, BLACK)
+        mines_text = font.render(f"Мин осталось: {mines_left}", True, BLACK)
+        self.hud_rects = [
+            screen.blit(time_text, (30, screen.get_height() - 80)),
+            screen.blit(mines_text, (screen.get_width() - 930, screen.get_height() - 40))
+        ]
+        return dirty + self.hud_rects
+
+    def _draw_cell(self, surface, x, y, cell):
+        """Рисует клетку на поверхности куска и возвращает ее прямоугольник."""
+        # Закрытые и пустые открытые клетки - самые частые, они копируются готовыми
+        if not cell & (Board.REVEALED | Board.FLAGGED) and not (self.game_over and cell & Board.MINE):
+            return surface.blit(assets.closed_cell, (x, y))
+        if cell & (Board.REVEALED | Board.FLAGGED | Board.MINE | Board.COUNT_MASK) == Board.REVEALED:
+            return surface.blit(assets.open_cell, (x, y))
+        cell_size = self.camera.cell_size
+        rect = pygame.Rect(x, y, cell_size, cell_size)
+        cell_color = GRAY
+        if cell & Board.REVEALED and not cell & Board.MINE:
+            cell_color = DARK_GRAY
+        pygame.draw.rect(surface, cell_color, rect)
+        pygame.draw.rect(surface, LIGHT_GRAY, rect, 1)
+
+        if cell & Board.FLAGGED:
+            # Рисуем флажок
+            surface.blit(assets.flag, rect.topleft)
+            # Если игра окончена и флаг на мине - оставляем как есть
+            if self.game_over and not cell & Board.MINE:
+                # Рисуем перечеркнутый флаг если флаг не на мине
+                pygame.draw.line(surface, BLACK, rect.topleft, rect.bottomright, 3)
+                pygame.draw.line(surface, BLACK, rect.topright, rect.bottomleft, 3)
+
+        elif cell & Board.REVEALED:
+            if cell & Board.MINE:
+                # Рисуем мину если открыли
+                surface.blit(assets.mine, rect.topleft)
+            else:
+                value = cell & Board.COUNT_MASK
+                if value != 0:
+                    text = assets.digits[value]
+                    text_rect = text.get_rect(center=rect.center)
+                    surface.blit(text, text_rect)
+        # Показываем все мины, если игра окончена и клетка не открыта
+        elif self.game_over and cell & Board.MINE:
+            mine_offset = (cell_size - assets.small_mine.get_width()) // 2
+            surface.blit(assets.small_mine, (rect.x + mine_offset, rect.y + mine_offset))
+        return rect
+
+
+def draw_grid(screen, renderer, game_over=False, start_time=0, num_mines=0, buttons=True):
+    """Рисует игровое поле и возвращает список измененных областей экрана.
+
+    При buttons=False кнопки под полем не рисуются, их рисует сам экран.
+    """
+    board = renderer.board
+    with profiler.phase('grid.cells'):
+        dirty = renderer.draw(screen, game_over)
+
+    # Отображение времени и оставшихся мин
+    with profiler.phase('grid.hud'):
+        elapsed_time = int(time.time() - start_time)
+        mines_left = num_mines - board.flagged_count
+        dirty += renderer.draw_hud(screen, elapsed_time, mines_left)
+
+    # Отрисовываем кнопки
+    if not buttons:
+        return dirty
+    with profiler.phase('grid.buttons'):
+        new_game_rect, change_rect = game_button_rects(screen)
+        dirty.append(draw_button(screen, "Новая игра", *new_game_rect, GRAY, COLORR))
+        dirty.append(draw_button(screen, "Изменить сложность", *change_rect, GRAY, COLORR))
+    return dirty
+
+
+def game_button_rects(screen):
+    """Возвращает прямоугольники кнопок "Новая игра" и "Изменить сложность"."""
+    button_width = 220
+    button_height = 30
+    button_y = screen.get_height() - 90
+    return (pygame.Rect(340, button_y, button_width, button_height),
+            pygame.Rect(screen.get_width() - button_width - 400, button_y + 40, button_width, button_height))
+
+
+def game_buttons(app, game_scene):
+    """Слой с кнопками "Новая игра" и "Изменить сложность" под полем партии game_scene.
+
+    Новая партия ежедневного испытания идет на том же поле.
+    """
+    widgets = WidgetLayer()
+    new_game_rect, change_rect = game_button_rects(app.screen)
+    new_game = lambda: (SWITCH, GameScene(app, *game_scene.size, daily=game_scene.daily))
+    widgets.add(Button("Новая игра", new_game_rect, new_game, GRAY))
+    widgets.add(Button("Изменить сложность", change_rect, lambda: (POP, None), GRAY))
+    return widgets
+
+
+def draw_button(screen, text, x, y, width, height, color, hover_color, size=30):
+    """Рисует кнопку с надписью шрифтом size и возвращает ее прямоугольник."""
+    mouse = pygame.mouse.get_pos()
+    rect = pygame.Rect(x, y, width, height)
+    color = hover_color if rect.collidepoint(mouse) else color
+    pygame.draw.rect(screen, color, rect)
+    text_surf = assets.label(text, size)
+    text_rect = text_surf.get_rect(center=rect.center)
+    screen.blit(text_surf, text_rect)
+    return rect
+
+
+def board_layout(width, height, num_mines):
+    """Возвращает размер окна, начальный размер клетки и область экрана под поле.
+
+    Если клетки целого поля получаются меньше MIN_FIT_CELL_SIZE, область
+    занимает все окно над кнопками, а поле прокручивается камерой.
+    """
+    side = int(max(WIDTH, HEIGHT) * 1.2)
+    if (width, height, num_mines) == HARD_SIZE:
+        cell_size = min(side // (width + 2), side // (height + 2))
+        offset_x = (side - cell_size * width) // 2
+        offset_y = (side - cell_size * height) // 2
+        return (side, side), cell_size, pygame.Rect(offset_x, offset_y, cell_size * width, cell_size * height)
+    area_height = int(side * 0.9) - 100
+    cell_size = min(side // width, area_height // height)
+    if cell_size < MIN_FIT_CELL_SIZE:
+        return (side, int(side * 0.9)), SCROLL_CELL_SIZE, pygame.Rect(10, 10, side - 20, area_height - 10)
+    offset_x = (side - cell_size * width) // 2
+    offset_y = (area_height - cell_size * height) // 2
+    return (side, int(side * 0.9)), cell_size, pygame.Rect(offset_x, offset_y, cell_size * width, cell_size * height)
+
+
+# --- Виджеты ---
+class Widget:
+    """Элемент экрана, который сам рисуется и сам обрабатывает свои события.
+
+    Обработчики возвращают переход между экранами или None.
+    """
+    focusable = False
+
+    def __init__(self, rect):
+        self.rect = pygame.Rect(rect)
+
+    def on_click(self, event):
+        return None
+
+    def on_key(self, event):
+        return None
+
+    def on_wheel(self, event):
+        return None
+
+    def draw(self, screen):
+        """Рисует виджет и возвращает измененную область экрана."""
+        return self.rect
+
+
+class Button(Widget):
+    """Кнопка, которая вызывает action по щелчку левой кнопкой мыши."""
+
+    def __init__(self, text, rect, action, color=DARK_GRAY, hover_color=COLORR, size=30):
+        super().__init__(rect)
+        self.text = text
+        self.action = action
+        self.color = color
+        self.hover_color = hover_color
+        self.size = size
+
+    @property
+    def area(self):
+        """Кнопка вместе с надписью, которая может выходить за ее края."""
+        return self.rect.union(assets.label(self.text, self.size).get_rect(center=self.rect.center))
+
+    def on_click(self, event):
+        if event.button == 1:
+            return self.action()
+        return None
+
+    def draw(self, screen):
+        draw_button(screen, self.text, *self.rect, self.color, self.hover_color, self.size)
+        return self.area
+
+
+class TextInput(Widget):
+    """Поле ввода: получает клавиши, пока на нем фокус, и растет вместе с текстом.
+
+    accept решает, можно ли добавить введенный символ; on_submit вызывается
+    по Enter.
+    """
+    focusable = True
+
+    def __init__(self, rect, font, on_submit, accept=None):
+        super().__init__(rect)
+        self.min_width = self.rect.width
+        self.font = font
+        self.on_submit = on_submit
+        self.accept = accept
+        self.active = False
+        self.set_text('')
+
+    def set_text(self, text):
+        self.text = text
+        self.text_surface = self.font.render(text, True, BLACK)
+        self.rect.w = max(self.min_width, self.text_surface.get_width() + 10)
+
+    def on_key(self, event):
+        if event.key == pygame.K_RETURN:
+            return self.on_submit()
+        if event.key == pygame.K_BACKSPACE:
+            self.set_text(self.text[:-1])
+        elif event.unicode and (self.accept is None or self.accept(event.unicode)):
+            self.set_text(self.text + event.unicode)
+        return None
+
+    def draw(self, screen):
+        pygame.draw.rect(screen, GRAY if self.active else DARK_GRAY, self.rect, 2)
+        screen.blit(self.text_surface, (self.rect.x + 5, self.rect.y + 5))
+        return self.rect
+
+
+class RecordsList(Widget):
+    """Прокручиваемый список рекордов одной сложности.
+
+    Видимые строки подгружает RecordsPager, а отрисованные строки хранятся в
+    row_cache между кадрами. Щелчок по строке вызывает on_select с id рекорда.
+    """
+    row_height = 25
+
+    def __init__(self, rect, cursor, difficulty, on_select=None):
+        super().__init__(rect)
+        self.cursor = cursor
+        self.on_select = on_select
+        self.font = assets.font(24)
+        self.row_cache = OrderedDict()
+        self.show(difficulty)
+
+    def show(self, difficulty):
+        """Показывает рекорды другой сложности с начала списка."""
+        self.difficulty = difficulty
+        self.pager = RecordsPager(self.cursor, difficulty)
+        self.top = 0
+        stats = load_stats(self.cursor, difficulty)
+        self.stats = self.font.render(format_stats(stats), True, BLACK) if stats and stats["games"] else None
+
+    @property
+    def visible_rows(self):
+        return self.rect.height // self.row_height
+
+    def scroll_to(self, top):
+        self.top = max(0, min(top, self.pager.total - self.visible_rows))
+
+    def on_wheel(self, event):
+        self.scroll_to(self.top - event.y * 3)
+
+    def on_click(self, event):
+        if event.button != 1 or self.on_select is None:
+            return None
+        row = (event.pos[1] - self.rect.y) // self.row_height
+        rows = self.pager.rows_at(self.top, self.visible_rows)
+        if 0 <= row < len(rows):
+            return self.on_select(rows[row][0])
+        return None
+
+    def on_key(self, event):
+        steps = {
+            pygame.K_UP: -1,
+            pygame.K_DOWN: 1,
+            pygame.K_PAGEUP: -self.visible_rows,
+            pygame.K_PAGEDOWN: self.visible_rows,
+        }
+        if event.key in steps:
+            self.scroll_to(self.top + steps[event.key])
+        elif event.key == pygame.K_HOME:
+            self.scroll_to(0)
+        elif event.key == pygame.K_END:
+            self.scroll_to(self.pager.total)
+
+    def row_surface(self, rank, row):
+        """Возвращает отрисованную строку таблицы, используя кэш."""
+        key = (row[0], rank)
+        surface = self.row_cache.get(key)
+        if surface is None:
+            record_id, name, difficulty, time, date = row
+            surface = self.font.render(f"{rank}. {name} - {time} сек - {date}", True, BLACK)
+            self.row_cache[key] = surface
+            if len(self.row_cache) > ROW_CACHE_SIZE:
+                self.row_cache.popitem(last=False)
+        else:
+            self.row_cache.move_to_end(key)
+        return surface
+
+    def draw(self, screen):
+        rows = self.pager.rows_at(self.top, self.visible_rows)
+        y = self.rect.y
+        for rank, row in enumerate(rows, start=self.top + 1):
+            screen.blit(self.row_surface(rank, row), (self.rect.x + 20, y))
+            y += self.row_height
+        if rows:
+            position = f"{self.top + 1}-{self.top + len(rows)} из {self.pager.total}"
+        else:
+            position = "Рекордов пока нет"
+        position_rect = screen.blit(self.font.render(position, True, BLACK), (self.rect.x, self.rect.bottom + 10))
+        if self.stats is not None:
+            stats_rect = self.stats.get_rect(topright=(self.rect.right, position_rect.top))
+            position_rect.union_ip(screen.blit(self.stats, stats_rect))
+        return self.rect.union(position_rect)
+
+
+class WidgetLayer:
+    """Виджеты экрана и сеточный индекс для поиска виджета под курсором.
+
+    Прямоугольники виджетов раскладываются по ячейкам сетки со стороной
+    HIT_GRID_CELL, так что щелчок проверяет только виджеты своей ячейки.
+    Щелчок получает виджет под курсором, клавиши и колесо мыши - виджет
+    с фокусом, а без него - виджет по умолчанию.
+    """
+
+    def __init__(self, cell=HIT_GRID_CELL):
+        self.cell = cell
+        self.widgets = []
+        self.grid = {}
+        self.indexed = {}
+        self.focus = None
+        self.default = None
+
+    def add(self, widget, default=False):
+        """Добавляет виджет поверх остальных и возвращает его."""
+        self.widgets.append(widget)
+        self._index(widget)
+        if default:
+            self.default = widget
+        return widget
+
+    def clear(self):
+        self.widgets.clear()
+        self.grid.clear()
+        self.indexed.clear()
+        self.focus = self.default = None
+
+    def _cells(self, rect):
+        cell = self.cell
+        return [(x, y) for y in range(rect.top // cell, (rect.bottom - 1) // cell + 1)
+                for x in range(rect.left // cell, (rect.right - 1) // cell + 1)]
+
+    def _index(self, widget):
+        """Кладет виджет в ячейки сетки по его текущему прямоугольнику."""
+        old = self.indexed.get(widget)
+        if old is not None:
+            for key in self._cells(old):
+                self.grid[key].remove(widget)
+        rect = widget.rect.copy()
+        self.indexed[widget] = rect
+        for key in self._cells(rect):
+            self.grid.setdefault(key, []).append(widget)
+
+    def widget_at(self, pos):
+        """Верхний виджет в точке pos или None."""
+        candidates = self.grid.get((pos[0] // self.cell, pos[1] // self.cell), ())
+        for widget in sorted(candidates, key=self.widgets.index, reverse=True):
+            if widget.rect.collidepoint(pos):
+                return widget
+        return None
+
+    def set_focus(self, widget):
+        if self.focus is not None:
+            self.focus.active = False
+        self.focus = widget
+        if widget is not None:
+            widget.active = True
+
+    def dispatch(self, event):
+        """Передает событие нужному виджету и возвращает результат обработчика."""
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            widget = self.widget_at(event.pos)
+            self.set_focus(widget if widget is not None and widget.focusable else None)
+            if widget is not None:
+                return widget.on_click(event)
+            return None
+        target = self.focus or self.default
+        if target is None:
+            return None
+        if event.type == pygame.KEYDOWN:
+            result = target.on_key(event)
+        elif event.type == pygame.MOUSEWHEEL:
+            result = target.on_wheel(event)
+        else:
+            return None
+        # Поле ввода могло вырасти вместе с текстом
+        if target.rect != self.indexed[target]:
+            self._index(target)
+        return result
+
+    def draw(self, screen):
+        """Рисует виджеты и возвращает измененные области экрана."""
+        return [widget.draw(screen) for widget in self.widgets]
+
+
+# --- Экраны ---
+# Переходы между экранами, которые возвращают handle_event и update
+PUSH = 'push'
+POP = 'pop'
+SWITCH = 'switch'
+
+
+class Scene:
+    """Экран игры в стеке экранов приложения.
+
+    App.run передает экрану события, затем вызывает update и draw. Чтобы
+    перейти на другой экран, handle_event или update возвращают пару
+    (PUSH, экран), (SWITCH, экран) или (POP, None).
+    """
+    name = "scene"
+    idle = True
+
+    def __init__(self, app):
+        self.app = app
+        self.scheduler = LoopScheduler(self.name)
+        self.background = None
+
+    def enter(self):
+        """Вызывается, когда экран оказывается на вершине стека."""
+
+    def static_layer(self, screen):
+        """Возвращает фон экрана с неизменной частью кадра, рисуя его один раз."""
+        if self.background is None or self.background.get_size() != screen.get_size():
+            self.background = pygame.Surface(screen.get_size())
+            self.draw_static(self.background)
+        return self.background
+
+    def draw_static(self, surface):
+        """Рисует неизменную часть кадра для static_layer."""
+        surface.fill(LIGHT_GRAY)
+
+    def timeout(self):
+        """Сколько миллисекунд ждать события в режиме простоя."""
+        return IDLE_TIMEOUT
+
+    def handle_event(self, event):
+        return None
+
+    def update(self):
+        return None
+
+    def draw(self, screen):
+        """Рисует кадр и возвращает список измененных областей экрана."""
+        return []
+
+
+class App:
+    """Окно, база рекордов и стек экранов.
+
+    pygame и окно инициализируются один раз, а глубина стека не растет от
+    партии к партии.
+    """
+
+    def __init__(self):
+        # Процессы пула запускаются до инициализации pygame и потока записи
+        self.boards = BoardPool((EASY_SIZE, MEDIUM_SIZE, HARD_SIZE))
+        pygame.init()
+        pygame.display.set_caption("Сапер")
+        self.screen = None
+        self.conn, self.cursor = create_db()
+        self.records = RecordWriter() if self.conn is not None else None
+        self.scenes = []
+        self.no_guess = False
+        self.show_profile = False
+        self.overlay = None
+        self.overlay_time = 0.0
+        # Время до первого кадра: от запуска и после каждой смены экрана
+        self.startup_ms = None
+        self.transition_start = LAUNCH_TIME
+        self.transition_name = None
+        self.transitions = {}
+        # Отклик на ввод: от получения щелчка или клавиши до кадра с результатом
+        self.pending_inputs = []
+        self.input_latency = {}
+
+    def set_window_size(self, size):
+        """Меняет размер окна, только если он отличается от текущего."""
+        if self.screen is None or self.screen.get_size() != size:
+            self.screen = pygame.display.set_mode(size)
+
+    def run(self, scene):
+        """Главный цикл: работает, пока в стеке есть экраны."""
+        self.scenes = [scene]
+        scene.enter()
+        while self.scenes:
+            scene = self.scenes[-1]
+            transition = None
+            events = scene.scheduler.events(scene.idle, scene.timeout())
+            frame_start = time.perf_counter()
+            with profiler.phase('events'):
+                for event in events:
+                    if event.type == pygame.QUIT:
+                        self.scenes.clear()
+                        return
+                    if event.type == pygame.KEYDOWN and event.key == pygame.K_F3 and profiler.enabled:
+                        self.toggle_profile()
+                        continue
+                    if event.type in (pygame.MOUSEBUTTONDOWN, pygame.KEYDOWN):
+                        self.pending_inputs.append((f"{scene.name}: {pygame.event.event_name(event.type)}",
+                                                    frame_start))
+                    transition = scene.handle_event(event)
+                    if transition:
+                        break
+            if not transition:
+                with profiler.phase('update'):
+                    transition = scene.update()
+            if transition:
+                self._apply(transition, frame_start)
+                continue
+            with profiler.phase('draw'):
+                dirty = scene.draw(self.screen)
+            if self.show_profile:
+                dirty.append(self.draw_profile())
+            if dirty:
+                with profiler.phase('display'):
+                    pygame.display.update(dirty)
+            if self.transition_start is not None:
+                self._finish_transition()
+            if self.pending_inputs:
+                self._finish_inputs()
+            profiler.end_frame()
+
+    def _finish_inputs(self):
+        """Учитывает отклик на события, результат которых только что показан."""
+        now = time.perf_counter()
+        for name, received in self.pending_inputs:
+            ms = (now - received) * 1000
+            samples = self.input_latency.get(name)
+            if samples is None:
+                samples = self.input_latency[name] = deque(maxlen=HISTORY)
+            samples.append(ms)
+            if profiler.enabled:
+                profiler.record('input', ms)
+        self.pending_inputs.clear()
+
+    def _finish_transition(self):
+        """Учитывает время от запуска или смены экрана до первого кадра."""
+        ms = (time.perf_counter() - self.transition_start) * 1000
+        self.transition_start = None
+        if self.transition_name is None:
+            self.startup_ms = ms
+            name = 'startup'
+        else:
+            stats = self.transitions.setdefault(self.transition_name, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += ms
+            stats[2] = max(stats[2], ms)
+            name = 'transition'
+        if profiler.enabled:
+            profiler.record(name, ms)
+
+    def report_timings(self):
+        """Печатает время запуска и переходов между экранами."""
+        if self.startup_ms is not None:
+            print(f"Запуск до первого кадра: {self.startup_ms:.0f} мс")
+        for name, (count, total, longest) in self.transitions.items():
+            print(f"Переход {name}: {count} раз, в среднем {total / count:.1f} мс, максимум {longest:.1f} мс")
+        for name, samples in self.input_latency.items():
+            values = sorted(samples)
+            print(f"Отклик {name}: {len(values)} событий, p50 {percentile(values, 50):.1f} мс, "
+                  f"p95 {percentile(values, 95):.1f} мс, максимум {values[-1]:.1f} мс")
+
+    def toggle_profile(self):
+        """Показывает или прячет панель профилировщика (клавиша F3)."""
+        self.show_profile = not self.show_profile
+        self.overlay = None
+        if not self.show_profile:
+            # Экран под панелью нужно перерисовать
+            pygame.event.post(pygame.event.Event(pygame.VIDEOEXPOSE))
+
+    def draw_profile(self):
+        """Рисует панель с процентилями времени фаз, обновляя ее 4 раза в секунду."""
+        now = time.perf_counter()
+        if self.overlay is None or now - self.overlay_time > OVERLAY_INTERVAL:
+            font = assets.font(20)
+            lines = [font.render("фаза: p50 / p95 / p99, мс", True, WHITE)]
+            for name, count, p50, p95, p99 in profiler.summary():
+                lines.append(font.render(f"{name}: {p50:.2f} / {p95:.2f} / {p99:.2f}", True, WHITE))
+            self.overlay = pygame.Surface((max(line.get_width() for line in lines) + 10,
+                                           sum(line.get_height() for line in lines) + 10))
+            self.overlay.fill(BLACK)
+            y = 5
+            for line in lines:
+                self.overlay.blit(line, (5, y))
+                y += line.get_height()
+            self.overlay_time = now
+        return self.screen.blit(self.overlay, (0, 0))
+
+    def _apply(self, transition, start):
+        action, scene = transition
+        previous = self.scenes[-1].name
+        if action == POP:
+            self.scenes.pop()
+        elif action == SWITCH:
+            self.scenes[-1] = scene
+        elif action == PUSH:
+            self.scenes.append(scene)
+        if self.scenes:
+            self.scenes[-1].enter()
+            self.transition_start = start
+            self.transition_name = f"{previous} -> {self.scenes[-1].name}"
+
+
+class MenuScene(Scene):
+    """Главное меню."""
+    name = "main_menu"
+    idle = False
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.side = int(max(WIDTH, HEIGHT) * 1.2)
+        button_width = 200
+        button_height = 40
+        button_x = self.side // 2 - button_width // 2
+        button_y_start = int(self.side / 2.2)
+        actions = (
+            ("Легкий", lambda: (PUSH, GameScene(app, *EASY_SIZE))),
+            ("Средний", lambda: (PUSH, GameScene(app, *MEDIUM_SIZE))),
+            ("Сложный", lambda: (PUSH, GameScene(app, *HARD_SIZE))),
+            ("Пользовательский", lambda: (PUSH, CustomSettingsScene(app))),
+            ("Испытание дня", lambda: (PUSH, GameScene(app, *DAILY_SIZE, daily=date.today()))),
+            ("Таблица рекордов", lambda: (PUSH, HighscoresScene(app))),
+            (self.no_guess_text(), self.toggle_no_guess),
+        )
+        self.widgets = WidgetLayer()
+        for i, (text, action) in enumerate(actions):
+            rect = pygame.Rect(button_x, button_y_start + 50 * i, button_width, button_height)
+            self.widgets.add(Button(text, rect, action))
+        self.no_guess_button = self.widgets.widgets[-1]
+        font = assets.font(26)
+        # Надписи об авторах и версии рисуются поверх бомб, поэтому не входят в фон
+        self.captions = []
+        for text, bottom_offset in (("Created by: Бородина Катя, Попов Сережа", 30), ("Version: 1.0", 10)):
+            caption = font.render(text, True, BLACK)
+            self.captions.append((caption, caption.get_rect(bottomleft=(10, self.side - bottom_offset))))
+        self.full_redraw = True
+        all_sprites.empty()
+
+    def enter(self):
+        self.app.set_window_size((self.side, self.side))
+        self.full_redraw = True
+        # Бомбам нужна картинка, а она загружается только после создания окна
+        if not all_sprites:
+            for i in range(50):
+                Bomb(all_sprites)
+
+    def handle_event(self, event):
+        if event.type in (pygame.VIDEOEXPOSE, pygame.VIDEORESIZE):
+            self.full_redraw = True
+        return self.widgets.dispatch(event)
+
+    def no_guess_text(self):
+        return "Без угадывания: вкл" if self.app.no_guess else "Без угадывания: выкл"
+
+    def toggle_no_guess(self):
+        self.app.no_guess = not self.app.no_guess
+        self.no_guess_button.text = self.no_guess_text()
+        # Надпись кнопки меняет ширину
+        self.full_redraw = True
+
+    def draw(self, screen):
+        background = self.static_layer(screen)
+        if self.full_redraw:
+            screen.blit(background, (0, 0))
+            old_rects = []
+        else:
+            # Стираем фоном бомбы там, где они были в прошлом кадре, и все
+            # надписи, чтобы сглаженные края текста не накладывались сами на себя
+            old_rects = [sprite.rect.copy() for sprite in all_sprites]
+            all_sprites.clear(screen, background)
+            for rect in [rect for caption, rect in self.captions] + [button.area for button in self.widgets.widgets]:
+                screen.blit(background, rect, rect)
+        all_sprites.update()
+        dirty = old_rects + all_sprites.draw(screen)
+
+        for caption, rect in self.captions:
+            dirty.append(screen.blit(caption, rect))
+
+        dirty += self.widgets.draw(screen)
+        if self.full_redraw:
+            self.full_redraw = False
+            return [screen.get_rect()]
+        return dirty
+
+
+# --- Функции игрового процесса ---
+def advance_reveal(game):
+    """Открывает очередные части пустой области, пока не выйдет время кадра."""
+    deadline = time.perf_counter() + REVEAL_FRAME_TIME
+    while game.pending and time.perf_counter() < deadline:
+        game.advance(REVEAL_BATCH)
+
+
+class GameScene(Scene):
+    """Основной экран игры."""
+    name = "play_game"
+
+    def __init__(self, app, width, height, num_mines, daily=None, seed=None):
+        super().__init__(app)
+        self.size = (width, height, num_mines)
+        # daily - день ежедневного испытания: поле у всех игроков одно и то же
+        self.daily = daily
+        if daily is not None:
+            seed = daily_seed(daily)
+        self.window_size, cell_size, view = board_layout(width, height, num_mines)
+        self.camera = Camera(view, width, height, cell_size)
+        self.camera.center_on(width // 2, height // 2)
+        if seed is None and app.no_guess and width * height <= MAX_SOLVER_CELLS:
+            # Мины расставляются первым ходом так, чтобы поле решалось без угадывания
+            self.game = NoGuessGame(width, height, num_mines, new_seed())
+        elif width * height > LAZY_BOARD_CELLS:
+            # Клетки большого поля создаются кусками по мере открытия и показа
+            self.game = Game(LazyBoard(width, height, num_mines, new_seed() if seed is None else seed), num_mines)
+        else:
+            self.game = Game(app.boards.take(self.size, seed), num_mines)
+        self.difficulty = daily_difficulty(daily) if daily is not None else difficulty_name(width, height, num_mines)
+        # Поле без угадывания зависит еще и от первого хода и времени поиска,
+        # поэтому по seed его не повторить и в рекорд он не попадает
+        self.seed = None if isinstance(self.game, NoGuessGame) else self.game.board.seed
+        self.renderer = None
+        self.widgets = None
+        self.hint = None
+        self.recorder = ReplayRecorder()
+        self.start_time = time.time()
+        self.elapsed_time = None
+
+    def enter(self):
+        self.app.set_window_size(self.window_size)
+        self.renderer = BoardRenderer(self.game.board, self.camera)
+        self.widgets = game_buttons(self.app, self)
+
+    def timeout(self):
+        # Поле меняется только от событий и пока открывается пустая область, а таймер - раз в секунду
+        if self.game.pending:
+            return 0
+        return 1000 - int((time.time() - self.start_time) * 1000) % 1000
+
+    def handle_event(self, event):
+        if event.type in (pygame.VIDEOEXPOSE, pygame.VIDEORESIZE):
+            self.renderer.invalidate()
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_h:
+            self.show_hint()
+        self.move_camera(event)
+        if event.type != pygame.MOUSEBUTTONDOWN:
+            return None
+        self.hide_hint()
+        if self.widgets.widget_at(event.pos) is not None:
+            return self.widgets.dispatch(event)
+        cell = self.camera.screen_to_cell(event.pos)
+        if event.button not in (1, 3) or cell is None or not self.game.board.in_bounds(*cell):
+            return None
+        cell_x, cell_y = cell
+        if self.game.status == Game.PLAYING:
+            self.recorder.add(REVEAL if event.button == 1 else FLAG, cell_y * self.game.board.width + cell_x,
+                              int((time.time() - self.start_time) * 1000))
+        if event.button == 1:  # Левая кнопка
+            # Остаток большой пустой области открывается в update следующих кадров
+            self.game.reveal(cell_x, cell_y, REVEAL_BATCH)
+        else:  # Правая кнопка
+            self.game.toggle_flag(cell_x, cell_y)
+        return None
+
+    def move_camera(self, event):
+        """Колесо мыши меняет масштаб, стрелки и средняя кнопка двигают поле."""
+        camera = self.camera
+        if event.type == pygame.MOUSEWHEEL:
+            camera.zoom(event.y, pygame.mouse.get_pos())
+        elif event.type == pygame.MOUSEMOTION and event.buttons[1]:
+            camera.pan(-event.rel[0], -event.rel[1])
+        elif event.type == pygame.KEYDOWN:
+            step_x = int(camera.view.width * PAN_STEP)
+            step_y = int(camera.view.height * PAN_STEP)
+            steps = {
+                pygame.K_LEFT: (-step_x, 0),
+                pygame.K_RIGHT: (step_x, 0),
+                pygame.K_UP: (0, -step_y),
+                pygame.K_DOWN: (0, step_y),
+            }
+            if event.key in steps:
+                camera.pan(*steps[event.key])
+
+    def show_hint(self):
+        """Находит клетку, которую можно открыть или пометить без угадывания."""
+        self.hide_hint()
+        self.hint = find_hint(self.game)
+        if self.hint is None:
+            print("Подсказок нет: без угадывания не обойтись")
+
+    def hide_hint(self):
+        if self.hint is not None:
+            kind, x, y = self.hint
+            self.renderer.invalidate_cell(y * self.game.board.width + x)
+            self.hint = None
+
+    def update(self):
+        advance_reveal(self.game)
+        if self.game.status == Game.PLAYING:
+            return None
+        self.elapsed_time = int(time.time() - self.start_time)
+        if self.game.status == Game.WON:
+            print("You Win! Time:", self.elapsed_time)
+        return SWITCH, EndScene(self.app, self)
+
+    def draw(self, screen):
+        dirty = draw_grid(screen, self.renderer, start_time=self.start_time, num_mines=self.game.num_mines)
+        if self.hint is not None:
+            # Зеленая рамка - клетку можно открыть, красная - в ней мина
+            kind, x, y = self.hint
+            rect = self.renderer.cell_rect(y * self.game.board.width + x).clip(self.camera.view)
+            if rect:
+                pygame.draw.rect(screen, GREEN if kind == 'safe' else RED, rect, 3)
+                dirty.append(rect)
+        return dirty
+
+
+class EndScene(Scene):
+    """Экран окончания игры с рамкой вокруг текста."""
+    name = "show_end_screen"
+
+    def __init__(self, app, game_scene):
+        super().__init__(app)
+        self.game_scene = game_scene
+        self.win = game_scene.game.status == Game.WON
+        self.drawn = False
+        self.name_rect = None
+        self.widgets = None
+        self.buttons = []
+        self.difficulty = game_scene.difficulty
+        self.rank = None
+        if self.win:
+            # Место среди сохраненных рекордов считается по сводной таблице и не зависит от их числа
+            self.rank = percentile_rank(app.cursor, self.difficulty, game_scene.elapsed_time)
+
+    def enter(self):
+        self.drawn = False
+        screen = self.app.screen
+        self.widgets = game_buttons(self.app, self.game_scene)
+        # Кнопки под полем подсвечиваются под мышью, поэтому рисуются каждый кадр, а не в фоне
+        self.buttons = list(self.widgets.widgets)
+        if self.win:
+            name_label = assets.label("Коснитесь здесь, чтобы ввести имя", 28, RR)
+            self.name_rect = name_label.get_rect(center=(screen.get_width() - 200, screen.get_height() - 40))
+            self.widgets.add(Button("Коснитесь здесь, чтобы ввести имя", self.name_rect, self.enter_name))
+
+    def enter_name(self):
+        game_scene = self.game_scene
+        replay = game_scene.recorder.encode(game_scene.game.board, game_scene.game.num_mines)
+        return SWITCH, NameEntryScene(self.app, self.difficulty, game_scene.elapsed_time, replay, game_scene.seed)
+
+    def handle_event(self, event):
+        if event.type in (pygame.VIDEOEXPOSE, pygame.VIDEORESIZE):
+            self.drawn = False
+        return self.widgets.dispatch(event)
+
+    def draw_static(self, surface):
+        game_scene = self.game_scene
+        renderer = BoardRenderer(game_scene.game.board, game_scene.camera, LIGHT_GRAY)
+        draw_grid(surface, renderer, True, game_scene.start_time, game_scene.game.num_mines, buttons=False)
+        message = "Поздравляем! Вы выиграли" if self.win else "Игра окончена! Вы проиграли"
+        text_surf = assets.label(message, 28, GREEN if self.win else RED)
+        message_y = surface.get_height() - (80 if self.rank is None else 93)
+        text_rect = text_surf.get_rect(center=(surface.get_width() - 200, message_y))
+        surface.blit(text_surf, text_rect)
+        if self.rank is not None:
+            rank_surf = assets.label(f"Топ {self.rank}% на уровне «{self.difficulty}»", 22)
+            surface.blit(rank_surf, rank_surf.get_rect(center=(surface.get_width() - 200, surface.get_height() - 72)))
+
+        if self.win:
+            text_surf2 = assets.label("Коснитесь здесь, чтобы ввести имя", 28, RR)
+
+            padding = 10
+            frame_rect = self.name_rect.inflate(padding * 2, padding * 2)
+
+            pygame.draw.rect(surface, BLACK, frame_rect, 2)
+            surface.blit(text_surf2, self.name_rect)
+
+    def draw(self, screen):
+        background = self.static_layer(screen)
+        dirty = []
+        if not self.drawn:
+            self.drawn = True
+            # Поле и надписи не меняются, после перекрытия окна кадр просто копируется
+            screen.blit(background, (0, 0))
+            dirty.append(screen.get_rect())
+        for button in self.buttons:
+            screen.blit(background, button.area, button.area)
+            dirty.append(button.draw(screen))
+        return dirty
+
+
+class NameEntryScene(Scene):
+    """Окно ввода имени игрока; введенное имя сохраняется в рекорды."""
+    name = "get_player_name"
+
+    def __init__(self, app, difficulty, elapsed_time, replay=None, seed=None):
+        super().__init__(app)
+        self.difficulty = difficulty
+        self.elapsed_time = elapsed_time
+        self.replay = replay
+        self.seed = seed
+        self.font = assets.font(30)
+        self.widgets = WidgetLayer()
+        self.input_box = None
+        prompt_font = assets.font(28)
+        self.prompt_text = prompt_font.render("Введите имя:", True, BLACK)
+
+    def enter(self):
+        screen = self.app.screen
+        rect = pygame.Rect(screen.get_width() // 2 - 100, screen.get_height() // 2 - 20, 200, 40)
+        self.widgets.clear()
+        self.input_box = self.widgets.add(TextInput(rect, self.font, self.submit))
+
+    def submit(self):
+        name = self.input_box.text
+        if name:
+            save_record(self.app.records, name, self.difficulty, self.elapsed_time, self.replay, self.seed)
+        return POP, None
+
+    def handle_event(self, event):
+        return self.widgets.dispatch(event)
+
+    def draw_static(self, surface):
+        surface.fill(LIGHT_GRAY)
+        prompt_rect = self.prompt_text.get_rect(center=(surface.get_width() // 2, surface.get_height() // 2 - 60))
+        surface.blit(self.prompt_text, prompt_rect)
+
+    def draw(self, screen):
+        screen.blit(self.static_layer(screen), (0, 0))
+        self.widgets.draw(screen)
+        return [screen.get_rect()]
+
+
+class HighscoresScene(Scene):
+    """Таблица рекордов с прокруткой и вкладками сложностей."""
+    name = "show_highscores"
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.widgets = WidgetLayer()
+        self.tabs = {}
+        self.table = None
+        self.hint_position = (0, 0)
+        # Вкладка испытания показывает рекорды сегодняшнего поля
+        self.tab_difficulties = dict(zip(DIFFICULTIES, DIFFICULTIES))
+        self.tab_difficulties[DAILY_NAME] = daily_difficulty(date.today())
+        self.selected = DIFFICULTIES[0]
+
+    def enter(self):
+        # Только что сохраненный рекорд, в том числе после партии на поле
+        # рекорда из этой таблицы, должен сразу попасть в таблицу
+        if self.app.records is not None:
+            self.app.records.flush()
+        screen = self.app.screen
+        self.widgets.clear()
+        # Кнопка "Назад"
+        button_width = 120
+        button_height = 30
+        button_x = screen.get_width() // 2 - button_width // 2
+        button_y = screen.get_height() - button_height - 20
+        list_rect = pygame.Rect(50, 70, screen.get_width() - 100, button_y - 110)
+        self.hint_position = (50, button_y + 8)
+        difficulty = self.tab_difficulties[self.selected]
+        self.table = self.widgets.add(RecordsList(list_rect, self.app.cursor, difficulty, self.play_record),
+                                      default=True)
+        tab_width = (screen.get_width() - 100) // len(self.tab_difficulties)
+        self.tabs = {}
+        for i, name in enumerate(self.tab_difficulties):
+            rect = pygame.Rect(50 + i * tab_width, 20, tab_width - 10, 30)
+            self.tabs[name] = self.widgets.add(Button(name, rect, lambda name=name: self.select(name), size=26))
+        self.widgets.add(Button("Назад", (button_x, button_y, button_width, button_height), lambda: (POP, None)))
+        self.select(self.selected)
+
+    def play_record(self, record_id):
+        """Начинает партию на том же поле, на котором поставлен рекорд."""
+        board = load_record_board(self.app.cursor, record_id)
+        if board is None:
+            print("Поле этого рекорда не сохранено")
+            return None
+        width, height, num_mines, seed = board
+        daily = daily_date(self.table.difficulty)
+        if daily is not None:
+            return PUSH, GameScene(self.app, width, height, num_mines, daily=daily)
+        return PUSH, GameScene(self.app, width, height, num_mines, seed=seed)
+
+    def select(self, tab_name):
+        """Показывает рекорды сложности вкладки tab_name с начала списка."""
+        self.selected = tab_name
+        difficulty = self.tab_difficulties[tab_name]
+        if difficulty != self.table.difficulty:
+            self.table.show(difficulty)
+        for name, tab in self.tabs.items():
+            tab.color = COLORR if name == tab_name else DARK_GRAY
+
+    def handle_event(self, event):
+        return self.widgets.dispatch(event)
+
+    def draw(self, screen):
+        screen.fill(LIGHT_GRAY)
+        screen.blit(assets.label("Щелчок по рекорду - сыграть на его поле", 22), self.hint_position)
+        self.widgets.draw(screen)
+        return [screen.get_rect()]
+
+
+class CustomSettingsScene(Scene):
+    """Меню пользовательских настроек."""
+    name = "custom_game_settings"
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.font = assets.font(30)
+        self.widgets = WidgetLayer()
+        self.input_boxes = {}
+
+    def enter(self):
+        screen = self.app.screen
+        self.widgets.clear()
+        self.input_boxes = {}
+        for i, key in enumerate(("Ширина", "Высота", "Кол-во мин")):
+            rect = pygame.Rect(screen.get_width() // 2 - 100, screen.get_height() // 2 - 120 + 60 * i, 200, 40)
+            self.input_boxes[key] = self.widgets.add(TextInput(rect, self.font, self.submit, str.isdigit))
+        # Кнопка "Назад"
+        button_width = 120
+        button_height = 30
+        button_x = screen.get_width() // 2 - button_width // 2
+        button_y = screen.get_height() - button_height - 20
+        self.widgets.add(Button("Назад", (button_x, button_y, button_width, button_height), lambda: (POP, None)))
+
+    def submit(self):
+        """Начинает игру с введенными размерами или очищает поля, если они неверны."""
+        text_inputs = {key: box.text for key, box in self.input_boxes.items()}
+        try:
+            width = int(text_inputs["Ширина"]) if text_inputs["Ширина"] != "" else 0
+            height = int(text_inputs["Высота"]) if text_inputs["Высота"] != "" else 0
+            num_mines = int(text_inputs["Кол-во мин"]) if text_inputs["Кол-во мин"] != "" else 0
+            if (5 <= width <= MAX_CUSTOM_SIDE and 5 <= height <= MAX_CUSTOM_SIDE
+                    and 1 <= num_mines < width * height):
+                return SWITCH, GameScene(self.app, width, height, num_mines)
+            print("Некорректные данные")
+        except ValueError:
+            print("Введите целые числа")
+        for box in self.input_boxes.values():
+            box.set_text("")
+        return None
+
+    def handle_event(self, event):
+        return self.widgets.dispatch(event)
+
+    def draw_static(self, surface):
+        surface.fill(LIGHT_GRAY)
+
+        # Надпись с инструкцией
+        instruction_font = assets.font(24)
+        instruction_text = "Кликните на поле ввода и введите цифры, затем нажмите 'Enter'\n" \
+                           f"Ширина и высота: от 5 до {MAX_CUSTOM_SIDE}; большое поле\n" \
+                           "двигается стрелками, масштаб - колесом мыши.\n" \
+                           "Кол-во мин: от 1 до (ширина * высота - 1)."
+
+        y_offset = surface.get_height() // 2 - 250
+        for line in instruction_text.split('\n'):
+            instruction_line = instruction_font.render(line, True, BLACK)
+            instruction_rect = instruction_line.get_rect(center=(surface.get_width() // 2, y_offset))
+            surface.blit(instruction_line, instruction_rect)
+            y_offset += instruction_line.get_height()
+
+        for key, box in self.input_boxes.items():
+            label_surface = self.font.render(key, True, BLACK)
+            label_rect = label_surface.get_rect(bottom=box.rect.top - 5, left=box.rect.left)
+            surface.blit(label_surface, label_rect)
+
+    def draw(self, screen):
+        screen.blit(self.static_layer(screen), (0, 0))
+        self.widgets.draw(screen)
+        return [screen.get_rect()]
+
+
+class ReplayScene(Scene):
+    """Ускоренный просмотр записанной партии обычной отрисовкой поля."""
+    name = "replay"
+    idle = False
+
+    def __init__(self, app, data, speed=REPLAY_SPEED):
+        super().__init__(app)
+        board, num_mines, self.moves = decode(data)
+        width, height = board.width, board.height
+        self.speed = speed
+        self.game = Game(board, num_mines)
+        self.window_size, cell_size, view = board_layout(width, height, num_mines)
+        self.camera = Camera(view, width, height, cell_size)
+        self.camera.center_on(width // 2, height // 2)
+        self.renderer = None
+        self.position = 0
+        self.start_time = time.time()
+
+    def enter(self):
+        self.app.set_window_size(self.window_size)
+        self.renderer = BoardRenderer(self.game.board, self.camera)
+
+    def elapsed_ms(self):
+        return int((time.time() - self.start_time) * 1000 * self.speed)
+
+    def handle_event(self, event):
+        if event.type in (pygame.VIDEOEXPOSE, pygame.VIDEORESIZE):
+            self.renderer.invalidate()
+        if event.type == pygame.MOUSEBUTTONDOWN or event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+            return POP, None
+        return None
+
+    def update(self):
+        advance_reveal(self.game)
+        elapsed_ms = self.elapsed_ms()
+        width = self.game.board.width
+        while self.position < len(self.moves) and self.moves[self.position][0] <= elapsed_ms:
+            ms, action, index = self.moves[self.position]
+            if not self.camera.view.contains(self.renderer.cell_rect(index)):
+                self.camera.center_on(index % width, index // width)
+            if action == FLAG:
+                self.game.toggle_flag(index % width, index // width)
+            else:
+                self.game.reveal(index % width, index // width, REVEAL_BATCH)
+            self.position += 1
+        return None
+
+    def draw(self, screen):
+        # Часы идут в speed раз быстрее, как и сама партия
+        start_time = time.time() - self.elapsed_ms() / 1000
+        return draw_grid(screen, self.renderer, self.game.status != Game.PLAYING, start_time, self.game.num_mines)
+
+
+def run_records_command(args, conn, cursor):
+    """Выполняет команды работы с базой рекордов без запуска игры."""
+    start = time.perf_counter()
+    try:
+        if args.export:
+            print(f"Выгружено рекордов: {export_records(cursor, args.export)}")
+        elif args.import_file:
+            print(f"Добавлено рекордов: {import_records(conn, args.import_file)}")
+        elif args.merge:
+            print(f"Добавлено рекордов: {merge_records(conn, args.merge)}")
+        else:
+            for difficulty in DIFFICULTIES + (daily_difficulty(date.today()),):
+                stats = load_stats(cursor, difficulty, args.stats)
+                if stats and stats["games"]:
+                    print(f"{difficulty}: {format_stats(stats)}")
+            return
+    except (OSError, ValueError, KeyError, sqlite3.Error) as e:
+        print(f"Ошибка при работе с рекордами: {e}")
+        return
+    print(f"Готово за {time.perf_counter() - start:.1f} сек")
+
+
+def main():
+    """Запускает игру с главного меню."""
+    parser = argparse.ArgumentParser(description="Сапер")
+    parser.add_argument('--profile', nargs='?', const=DEFAULT_TRACE, metavar='FILE',
+                        help="замерять фазы кадра (панель - F3) и сохранить трассу в .csv или .json")
+    parser.add_argument('--replay', type=int, metavar='ID', help="показать запись партии рекорда с этим id")
+    parser.add_argument('--speed', type=float, default=REPLAY_SPEED, help="ускорение просмотра записи")
+    parser.add_argument('--stats', metavar='NAME', help="показать статистику игрока и выйти")
+    records = parser.add_mutually_exclusive_group()
+    records.add_argument('--export', metavar='FILE', help="выгрузить рекорды в .csv или .jsonl и выйти")
+    records.add_argument('--import', dest='import_file', metavar='FILE',
+                         help="загрузить рекорды из .csv или .jsonl и выйти")
+    records.add_argument('--merge', metavar='DB', help="добавить рекорды из другой базы и выйти")
+    args = parser.parse_args()
+    if args.profile:
+        profiler.enable(args.profile)
+    if args.stats is not None or args.export or args.import_file or args.merge:
+        conn, cursor = create_db()
+        if conn is not None:
+            run_records_command(args, conn, cursor)
+            close_db()
+        return
+
+    app = App()
+    if app.conn is None:
+        app.boards.close()
+        return
+    try:
+        if args.replay is None:
+            app.run(MenuScene(app))
+        else:
+            data = load_replay(app.cursor, args.replay)
+            if data is None:
+                print(f"У рекорда {args.replay} нет записи партии")
+            else:
+                app.run(ReplayScene(app, data, args.speed))
+    finally:
+        # Рекорды из очереди записываются и при выходе по ошибке
+        app.records.close()
+        app.boards.close()
+        pygame.quit()
+        close_db()
+    report_cpu_usage()
+    app.report_timings()
+    app.boards.report()
+    if profiler.enabled:
+        for name, count, p50, p95, p99 in profiler.summary():
+            print(f"{name}: p50 {p50:.2f} мс, p95 {p95:.2f} мс, p99 {p99:.2f} мс ({count} замеров)")
+        profiler.dump()
+
+
+if __name__ == "__main__":
+    # В собранном exe процессы BoardPool иначе запускали бы игру заново
+    multiprocessing.freeze_support()
+    main()
@@ -0,0 +1,247 @@
+"""Запись партий в компактном двоичном виде и их проверка без окна.
+
+Формат записи (little-endian):
+    заголовок  <4sBBHHII: b'MSRP', версия, вид поля, ширина, высота, мины,
+               число ходов
+    мины       для обычного поля (BITSET) - битовая маска клеток,
+               (ширина * высота + 7) // 8 байт; для ленивого (SEEDED) -
+               <Q с seed поля
+    ходы       <II на ход: миллисекунды от начала партии и индекс клетки,
+               старший бит индекса означает флажок вместо открытия
+
+Пакетный файл для проверки таблицы рекордов состоит из кадров <IIBIq: id
+рекорда, заявленное время, длина названия сложности, длина записи и seed
+поля из таблицы (NO_SEED, если его нет), за которыми идут название в UTF-8
+и сама запись.
+
+Запуск: python replay.py export replays.bin [--db minesweeper_records.db]
+        python replay.py verify replays.bin
+"""
+import argparse
+import mmap
+import sqlite3
+import struct
+import time
+
+from game_logic import DAILY_SIZE, Board, Game, LazyBoard, daily_date, daily_seed, difficulty_name, generate_board
+
+MAGIC = b'MSRP'
+VERSION = 3
+HEADER = struct.Struct('<4sBBHHII')
+SEED = struct.Struct('<Q')
+MOVE = struct.Struct('<II')
+FRAME = struct.Struct('<IIBIq')
+NO_SEED = -1
+FLAG_BIT = 1 << 31
+REVEAL = 0
+FLAG = 1
+BITSET = 0
+SEEDED = 1
+
+# Перевод байтов клеток в строку битов мин для int(..., 2)
+_MINE_BITS = bytes(ord('1') if cell & Board.MINE else ord('0') for cell in range(256))
+
+
+class ReplayRecorder:
+    """Копит ходы партии и упаковывает их вместе с расположением мин."""
+
+    def __init__(self):
+        self.moves = bytearray()
+        self.count = 0
+
+    def add(self, action, index, ms):
+        """Записывает ход: REVEAL или FLAG в клетку index через ms от начала."""
+        self.moves += MOVE.pack(ms, index | FLAG_BIT if action == FLAG else index)
+        self.count += 1
+
+    def encode(self, board, num_mines):
+        """Возвращает запись партии на поле board."""
+        if isinstance(board, LazyBoard):
+            # Ленивое поле целиком задается своим seed
+            return (HEADER.pack(MAGIC, VERSION, SEEDED, board.width, board.height, num_mines, self.count)
+                    + SEED.pack(board.seed) + self.moves)
+        total = board.width * board.height
+        mines = int(board.cells.translate(_MINE_BITS)[::-1], 2) if total else 0
+        return (HEADER.pack(MAGIC, VERSION, BITSET, board.width, board.height, num_mines, self.count)
+                + mines.to_bytes((total + 7) // 8, 'little') + self.moves)
+
+
+def board_size(data):
+    """Размер поля записи (ширина, высота, мины) по одному заголовку."""
+    if len(data) < HEADER.size:
+        raise ValueError("Запись обрезана")
+    magic, version, kind, width, height, num_mines, count = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Неизвестный формат записи")
+    return width, height, num_mines
+
+
+def decode(data):
+    """Разбирает запись: (поле, число мин, ходы).
+
+    Ходы - список (миллисекунды, REVEAL или FLAG, индекс клетки). data может
+    быть bytes, memoryview или срезом mmap.
+    """
+    magic, version, kind, width, height, num_mines, count = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION or kind not in (BITSET, SEEDED):
+        raise ValueError("Неизвестный формат записи")
+    offset = HEADER.size
+    if kind == SEEDED:
+        board = LazyBoard(width, height, num_mines, SEED.unpack_from(data, offset)[0])
+        offset += SEED.size
+    else:
+        size = (width * height + 7) // 8
+        bits = format(int.from_bytes(data[offset:offset + size], 'little'), 'b')[::-1]
+        mine_indices = []
+        index = bits.find('1')
+        while index >= 0:
+            mine_indices.append(index)
+            index = bits.find('1', index + 1)
+        board = Board.from_mines(width, height, mine_indices)
+        offset += size
+    end = offset + count * MOVE.size
+    if end > len(data):
+        raise ValueError("Запись обрезана")
+    moves = [(ms, FLAG if cell & FLAG_BIT else REVEAL, cell & ~FLAG_BIT)
+             for ms, cell in MOVE.iter_unpack(data[offset:end])]
+    return board, num_mines, moves
+
+
+def simulate(data):
+    """Повторяет партию по записи. Возвращает (партия, время последнего хода в мс)."""
+    board, num_mines, moves = decode(data)
+    game = Game(board, num_mines)
+    width = board.width
+    last_ms = 0
+    for ms, action, index in moves:
+        x, y = index % width, index // width
+        if action == FLAG:
+            game.toggle_flag(x, y)
+        else:
+            game.reveal(x, y)
+        last_ms = ms
+    return game, last_ms
+
+
+def _same_mines(board, other):
+    return board.cells.translate(_MINE_BITS) == other.cells.translate(_MINE_BITS)
+
+
+def verify(data, difficulty=None, claimed_time=None, seed=None):
+    """Проверяет рекорд по записи. Возвращает None или описание ошибки.
+
+    Если известен seed поля, расположение мин должно совпасть с полем,
+    которое из него создается.
+    """
+    try:
+        game, last_ms = simulate(data)
+    except (ValueError, struct.error) as e:
+        return f"запись повреждена: {e}"
+    board = game.board
+    seeded = isinstance(board, LazyBoard)
+    # В ленивом поле мин ровно столько, сколько в заголовке, по построению
+    if not seeded and board.cells.translate(_MINE_BITS).count(b'1') != game.num_mines:
+        return "число мин не совпадает с заголовком"
+    if game.status != Game.WON:
+        return "партия по записи не выиграна"
+    if seed is not None:
+        if seeded:
+            if board.seed != seed:
+                return "поле не совпадает с seed рекорда"
+        elif not _same_mines(board, generate_board(board.width, board.height, game.num_mines, seed)):
+            return "поле не совпадает с seed рекорда"
+    day = daily_date(difficulty)
+    if day is not None:
+        # Рекорд испытания должен быть поставлен на поле этого дня
+        if (board.width, board.height, game.num_mines) != DAILY_SIZE:
+            return "размер поля не совпадает со сложностью"
+        if not _same_mines(board, generate_board(*DAILY_SIZE, daily_seed(day))):
+            return "поле не совпадает с полем испытания"
+    elif difficulty is not None and difficulty != difficulty_name(board.width, board.height, game.num_mines):
+        return "размер поля не совпадает со сложностью"
+    # Время в таблице целое и фиксируется на кадр позже последнего хода
+    if claimed_time is not None and abs(last_ms // 1000 - claimed_time) > 1:
+        return f"время {claimed_time} сек не совпадает с записью ({last_ms / 1000:.1f} сек)"
+    return None
+
+
+def write_batch(path, rows):
+    """Пишет кадры (id, сложность, время, запись, seed) в пакетный файл. Возвращает их число."""
+    count = 0
+    with open(path, 'wb') as file:
+        for record_id, difficulty, claimed_time, data, seed in rows:
+            name = difficulty.encode('utf-8')
+            file.write(FRAME.pack(record_id, claimed_time, len(name), len(data), NO_SEED if seed is None else seed))
+            file.write(name)
+            file.write(data)
+            count += 1
+    return count
+
+
+def iter_batch(view):
+    """Перебирает кадры пакетного файла без копирования записей."""
+    offset = 0
+    while offset < len(view):
+        record_id, claimed_time, name_size, size, seed = FRAME.unpack_from(view, offset)
+        offset += FRAME.size
+        difficulty = bytes(view[offset:offset + name_size]).decode('utf-8')
+        offset += name_size
+        yield record_id, difficulty, claimed_time, view[offset:offset + size], None if seed == NO_SEED else seed
+        offset += size
+
+
+def export_replays(db_path, path):
+    """Выгружает записи всех рекордов из базы в пакетный файл."""
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute("SELECT id, difficulty, time, replay, seed FROM records WHERE replay IS NOT NULL ORDER BY id")
+        return write_batch(path, rows)
+    finally:
+        conn.close()
+
+
+def verify_batch(path):
+    """Проверяет все записи пакетного файла. Возвращает (число, ошибки)."""
+    failures = []
+    count = 0
+    with open(path, 'rb') as file:
+        if not file.seek(0, 2):
+            return 0, failures
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                for record_id, difficulty, claimed_time, data, seed in iter_batch(view):
+                    error = verify(data, difficulty, claimed_time, seed)
+                    if error:
+                        failures.append((record_id, error))
+                    count += 1
+                    data.release()
+            finally:
+                view.release()
+    return count, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    export_parser = commands.add_parser('export', help="выгрузить записи рекордов из базы")
+    export_parser.add_argument('path')
+    export_parser.add_argument('--db', default='minesweeper_records.db')
+    verify_parser = commands.add_parser('verify', help="проверить записи из пакетного файла")
+    verify_parser.add_argument('path')
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        print(f"Выгружено записей: {export_replays(args.db, args.path)}")
+        return
+    start = time.perf_counter()
+    count, failures = verify_batch(args.path)
+    elapsed = time.perf_counter() - start
+    for record_id, error in failures:
+        print(f"Рекорд {record_id}: {error}")
+    rate = count / elapsed if elapsed else 0
+    print(f"Проверено записей: {count}, с ошибками: {len(failures)}, {rate:.0f} записей/сек")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""Решатель "Сапера": подсказки и поля, которые проходятся без угадывания.
+
+Множества клеток хранятся как битовые маски в целых числах: бит i
+соответствует клетке с индексом i.
+"""
+import random
+import time
+from functools import lru_cache
+
+from game_logic import Board, Game, get_cell_coords, open_empty_cells
+
+# Перебор вариантов делается только для групп не больше этого размера
+MAX_ENUMERATION_CELLS = 20
+MAX_ENUMERATION_STEPS = 20000
+NO_GUESS_TIME_LIMIT = 1.0
+# Маски соседей занимают память квадратично от числа клеток
+MAX_SOLVER_CELLS = 2500
+
+# Таблицы для перевода байтов клеток в строку битов для int(..., 2)
+_REVEALED_BITS = bytes(ord('1') if cell & Board.REVEALED else ord('0') for cell in range(256))
+_FLAGGED_BITS = bytes(ord('1') if cell & Board.FLAGGED else ord('0') for cell in range(256))
+
+
+def popcount(mask):
+    return bin(mask).count('1')
+
+
+def mask_indices(mask):
+    """Возвращает индексы установленных битов маски по возрастанию."""
+    indices = []
+    while mask:
+        low = mask & -mask
+        indices.append(low.bit_length() - 1)
+        mask ^= low
+    return indices
+
+
+def cells_mask(board, table):
+    """Маска клеток поля, для байтов которых table дает '1'."""
+    return int(board.cells.translate(table)[::-1], 2) if board.cells else 0
+
+
+@lru_cache(maxsize=16)
+def neighbour_masks(width, height):
+    """Маски соседей каждой клетки поля заданного размера."""
+    masks = []
+    for index in range(width * height):
+        x, y = get_cell_coords(index, width)
+        mask = 0
+        for ny in range(max(0, y - 1), min(y + 2, height)):
+            for nx in range(max(0, x - 1), min(x + 2, width)):
+                if (nx, ny) != (x, y):
+                    mask |= 1 << (ny * width + nx)
+        masks.append(mask)
+    return tuple(masks)
+
+
+def board_constraints(board, mines=0):
+    """Ограничения от открытых чисел.
+
+    Возвращает словарь {маска закрытых соседей: сколько среди них мин};
+    mines - маска мин, которые уже известны.
+    """
+    masks = neighbour_masks(board.width, board.height)
+    closed = ~cells_mask(board, _REVEALED_BITS) & ~mines
+    constraints = {}
+    for index, cell in enumerate(board.cells):
+        if cell & Board.REVEALED and cell & Board.COUNT_MASK:
+            unknown = masks[index] & closed
+            if unknown:
+                constraints[unknown] = (cell & Board.COUNT_MASK) - popcount(masks[index] & mines)
+    return constraints
+
+
+def deduce(board, mines=0, num_mines=None):
+    """Находит клетки, которые точно безопасны или точно заминированы.
+
+    Правила применяются от дешевых к дорогим, и как только одно из них дает
+    результат, он возвращается: сначала правило одной клетки, затем правило
+    пары пересекающихся ограничений, затем перебор вариантов для каждой
+    связной группы клеток на границе открытой области. Возвращает маски
+    (безопасные клетки, новые мины).
+    """
+    constraints = board_constraints(board, mines)
+    safe = found = 0
+    for mask, count in constraints.items():
+        if count == 0:
+            safe |= mask
+        elif count == popcount(mask):
+            found |= mask
+    if safe or found:
+        return safe, found
+
+    items = list(constraints.items())
+    by_cell = {}
+    for number, (mask, count) in enumerate(items):
+        for index in mask_indices(mask):
+            by_cell.setdefault(index, []).append(number)
+    for number, (mask_a, count_a) in enumerate(items):
+        for other in {other for index in mask_indices(mask_a) for other in by_cell[index]}:
+            if other == number:
+                continue
+            mask_b, count_b = items[other]
+            # В B \ A не меньше count_b - count_a мин; если это все клетки
+            # B \ A, то остальные мины A лежат в пересечении и A \ B пусто
+            only_b = mask_b & ~mask_a
+            if count_b - count_a == popcount(only_b):
+                found |= only_b
+                safe |= mask_a & ~mask_b
+    if safe or found:
+        return safe, found
+
+    for group, group_cells in _groups(items, by_cell):
+        if popcount(group_cells) <= MAX_ENUMERATION_CELLS:
+            group_safe, group_mines = _enumerate(group, group_cells)
+            safe |= group_safe
+            found |= group_mines
+    if safe or found or num_mines is None:
+        return safe, found
+
+    # Все оставшиеся мины известны или все закрытые клетки - мины
+    closed = ~cells_mask(board, _REVEALED_BITS) & ~mines & ((1 << board.width * board.height) - 1)
+    left = num_mines - popcount(mines)
+    if left == 0:
+        return closed, 0
+    if left == popcount(closed):
+        return 0, closed
+    return 0, 0
+
+
+def _groups(items, by_cell):
+    """Разбивает ограничения на группы, связанные общими клетками."""
+    seen = set()
+    for start in range(len(items)):
+        if start in seen:
+            continue
+        seen.add(start)
+        stack = [start]
+        group = []
+        group_cells = 0
+        while stack:
+            number = stack.pop()
+            mask = items[number][0]
+            group.append(items[number])
+            group_cells |= mask
+            for index in mask_indices(mask):
+                for other in by_cell[index]:
+                    if other not in seen:
+                        seen.add(other)
+                        stack.append(other)
+        yield group, group_cells
+
+
+def _enumerate(constraints, group_cells):
+    """Перебирает расстановки мин в группе клеток, совместные с ограничениями.
+
+    Возвращает маски клеток, свободных во всех расстановках и заминированных
+    во всех расстановках. Если перебор слишком долгий, возвращает (0, 0).
+    """
+    cells = mask_indices(group_cells)
+    touching = {index: [] for index in cells}
+    for mask, count in constraints:
+        for index in mask_indices(mask):
+            touching[index].append((mask, count))
+    always = group_cells
+    ever = 0
+    solutions = 0
+    steps = 0
+    # Стек вариантов: (позиция в cells, маска мин, маска решенных клеток)
+    stack = [(0, 0, 0)]
+    while stack:
+        steps += 1
+        if steps > MAX_ENUMERATION_STEPS:
+            return 0, 0
+        position, placed, decided = stack.pop()
+        if position == len(cells):
+            solutions += 1
+            always &= placed
+            ever |= placed
+            continue
+        bit = 1 << cells[position]
+        decided |= bit
+        for candidate in (placed, placed | bit):
+            for mask, count in touching[cells[position]]:
+                mines_in = popcount(mask & candidate)
+                if mines_in > count or mines_in + popcount(mask & ~decided) < count:
+                    break
+            else:
+                stack.append((position + 1, candidate, decided))
+    if not solutions:
+        return 0, 0
+    return group_cells & ~ever, always
+
+
+def find_hint(game):
+    """Возвращает подсказку ('safe' или 'mine', x, y) или None.
+
+    'safe' - закрытая клетка, которая точно без мины, 'mine' - клетка без
+    флажка, где мина точно есть.
+    """
+    board = game.board
+    if game.status != Game.PLAYING or not board.revealed_count or board.width * board.height > MAX_SOLVER_CELLS:
+        return None
+    flagged = cells_mask(board, _FLAGGED_BITS)
+    mines = 0
+    while True:
+        safe, found = deduce(board, mines, game.num_mines)
+        if safe:
+            return ('safe',) + get_cell_coords(mask_indices(safe)[0], board.width)
+        found &= ~mines
+        unflagged = found & ~flagged
+        if unflagged:
+            return ('mine',) + get_cell_coords(mask_indices(unflagged)[0], board.width)
+        if not found:
+            return None
+        mines |= found
+
+
+def is_solvable(board, x, y):
+    """Проверяет, открывается ли все поле без угадывания с хода в (x, y)."""
+    work = Board(board.width, board.height)
+    work.cells = bytearray(board.cells)
+    num_mines = work.cells.count(Board.MINE)
+    safe_cells = board.width * board.height - num_mines
+    if work.is_mine(x, y):
+        return False
+    open_empty_cells(work, x, y)
+    mines = 0
+    while work.revealed_count < safe_cells:
+        safe, found = deduce(work, mines, num_mines)
+        if not safe and not found & ~mines:
+            return False
+        mines |= found
+        for index in mask_indices(safe):
+            open_empty_cells(work, *get_cell_coords(index, board.width))
+    return True
+
+
+def new_solvable_board(width, height, num_mines, x, y, time_limit=NO_GUESS_TIME_LIMIT, rng=random):
+    """Создает поле, которое проходится без угадывания с первого хода в (x, y).
+
+    В клетке первого хода и, если хватает места, вокруг нее мин нет. Если за
+    time_limit секунд такое поле не нашлось, возвращается последнее
+    сгенерированное. Мины выбираются генератором rng.
+    """
+    start = y * width + x
+    excluded = {start} | set(mask_indices(neighbour_masks(width, height)[start]))
+    if width * height - len(excluded) < num_mines:
+        excluded = {start}
+    free_cells = [index for index in range(width * height) if index not in excluded]
+    deadline = time.perf_counter() + time_limit
+    while True:
+        board = Board.from_mines(width, height, rng.sample(free_cells, num_mines))
+        if is_solvable(board, x, y) or time.perf_counter() > deadline:
+            return board
+
+
+class NoGuessGame(Game):
+    """Партия, поле которой создается первым ходом и решается без угадывания."""
+
+    def __init__(self, width, height, num_mines, seed=None):
+        super().__init__(Board(width, height), num_mines)
+        self.board.seed = seed
+        self.generated = False
+
+    def reveal(self, x, y, limit=None):
+        board = self.board
+        if not self.generated and board.in_bounds(x, y) and not board.is_flagged(x, y):
+            # Поле зависит и от первого хода, поэтому seed не задает его целиком
+            rng = random if board.seed is None else random.Random(f"{board.seed}:{x}:{y}")
+            solvable = new_solvable_board(board.width, board.height, self.num_mines, x, y, rng=rng)
+            # Флажки, поставленные до первого хода, остаются на месте
+            board.cells[:] = bytes(new | old for new, old in zip(solvable.cells, board.cells))
+            self.generated = True
+        return super().reveal(x, y, limit)
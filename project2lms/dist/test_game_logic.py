@@ -0,0 +1,117 @@
+"""Проверка подсчета чисел, ленивого поля и открытия пустых областей.
+
+Запуск: python -m unittest test_game_logic
+"""
+import random
+import unittest
+
+from game_logic import (LAZY_CHUNK, Board, Game, LazyBoard, count_adjacent_mines, count_all_adjacent_mines,
+                        open_empty_cells)
+
+
+def without_mines(counts, width, height, mine_indices):
+    """Числа клеток без мин; в клетке с миной число не показывается."""
+    mines = set(mine_indices)
+    return [counts[index] for index in range(width * height) if index not in mines]
+
+
+def reference_counts(width, height, mine_indices):
+    """Числа всех клеток, посчитанные по одной через count_adjacent_mines."""
+    mines = set(mine_indices)
+    grid = [['*' if y * width + x in mines else '.' for x in range(width)] for y in range(height)]
+    return [count_adjacent_mines(grid, x, y) for y in range(height) for x in range(width)]
+
+
+class CountAllAdjacentMinesTest(unittest.TestCase):
+
+    def check(self, width, height, num_mines, rng):
+        mine_indices = rng.sample(range(width * height), num_mines)
+        self.assertEqual(without_mines(count_all_adjacent_mines(width, height, mine_indices),
+                                       width, height, mine_indices),
+                         without_mines(reference_counts(width, height, mine_indices),
+                                       width, height, mine_indices),
+                         f"поле {width}x{height}, мины {sorted(mine_indices)}")
+
+    def test_random_boards(self):
+        rng = random.Random(2024)
+        for _ in range(200):
+            width, height = rng.randint(1, 20), rng.randint(1, 20)
+            self.check(width, height, rng.randint(0, width * height), rng)
+
+    def test_single_row_and_column(self):
+        rng = random.Random(7)
+        for length in range(1, 30):
+            for num_mines in (0, 1, length // 2, length):
+                self.check(length, 1, num_mines, rng)
+                self.check(1, length, num_mines, rng)
+
+
+class LazyBoardTest(unittest.TestCase):
+    # Стороны не кратны LAZY_CHUNK, есть поля в одну клетку шириной или высотой
+    SIZES = ((70, 45, 500), (33, 33, 100), (100, 64, 1500), (5, 7, 3), (1, 100, 30), (100, 1, 30),
+             (LAZY_CHUNK + 1, 1, 10), (1, 1, 0))
+
+    def test_total_mines(self):
+        for width, height, num_mines in self.SIZES:
+            for seed in range(3):
+                board = LazyBoard(width, height, num_mines, seed)
+                mines = bytes(board.cells[0:width * height]).count(Board.MINE)
+                self.assertEqual(mines, num_mines, f"поле {width}x{height}, seed {seed}")
+
+    def test_cells_match_regular_board(self):
+        for width, height, num_mines in self.SIZES:
+            lazy = LazyBoard(width, height, num_mines, 1234)
+            cells = bytes(lazy.cells[0:width * height])
+            mines = [index for index, cell in enumerate(cells) if cell & Board.MINE]
+            self.assertEqual(cells, bytes(Board.from_mines(width, height, mines).cells),
+                             f"поле {width}x{height}")
+
+    def test_chunks_in_any_order(self):
+        # Числа на краях куска не должны зависеть от того, какие куски уже созданы
+        width, height, num_mines = 100, 70, 900
+        forward = LazyBoard(width, height, num_mines, 5)
+        backward = LazyBoard(width, height, num_mines, 5)
+        for index in reversed(range(width * height)):
+            backward.cells[index]
+        self.assertEqual(bytes(backward.cells[0:width * height]), bytes(forward.cells[0:width * height]))
+
+    def test_reveal_matches_regular_board(self):
+        width, height, num_mines = 90, 70, 60
+        lazy = LazyBoard(width, height, num_mines, 9)
+        regular = Board(width, height)
+        regular.cells[:] = lazy.cells[0:width * height]
+        rng = random.Random(3)
+        for _ in range(20):
+            x, y = rng.randrange(width), rng.randrange(height)
+            if regular.is_mine(x, y):
+                continue
+            self.assertEqual(open_empty_cells(lazy, x, y),
+                             open_empty_cells(regular, x, y))
+        self.assertEqual(bytes(lazy.cells[0:width * height]), bytes(regular.cells))
+
+
+class GameRevealTest(unittest.TestCase):
+
+    def test_reveal_in_parts(self):
+        rng = random.Random(11)
+        for _ in range(100):
+            width, height = rng.randint(1, 40), rng.randint(1, 40)
+            num_mines = rng.randint(0, width * height - 1)
+            mines = rng.sample(range(width * height), num_mines)
+            whole = Board.from_mines(width, height, mines)
+            game = Game(Board.from_mines(width, height, mines), num_mines)
+            x, y = rng.randrange(width), rng.randrange(height)
+            if whole.is_mine(x, y):
+                continue
+            open_empty_cells(whole, x, y)
+            game.reveal(x, y, rng.choice((1, 3, 50)))
+            while game.pending:
+                game.advance(rng.choice((1, 7)))
+            self.assertEqual(bytes(game.board.cells), bytes(whole.cells))
+            self.assertEqual(game.board.revealed_count, whole.revealed_count)
+            if whole.revealed_count == width * height - num_mines:
+                self.assertEqual(game.status, Game.WON)
+
+
+if __name__ == "__main__":
+    unittest.main()
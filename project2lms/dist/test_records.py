@@ -0,0 +1,97 @@
+"""Проверка загрузки и слияния рекордов без повторов.
+
+Запуск: python -m unittest test_records
+"""
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+from projectlms import export_records, import_records, merge_records, migrate_db  # noqa: E402
+
+RECORDS = [
+    ("anna", "Легкий", 12, "01-02-2025 10:00:00", b"\x01\x02", 5),
+    ("anna", "Легкий", 12, "01-02-2025 10:05:00", None, None),
+    ("boris", "Средний", 80, "02-02-2025 11:00:00", None, 7),
+    ("boris", "Средний", 80, None, None, None),
+]
+
+
+class RecordsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.conn = self.open_db("records.db")
+
+    def tearDown(self):
+        self.conn.close()
+        shutil.rmtree(self.dir)
+
+    def open_db(self, name):
+        conn = sqlite3.connect(os.path.join(self.dir, name))
+        migrate_db(conn)
+        return conn
+
+    def insert(self, conn, rows):
+        with conn:
+            conn.executemany("INSERT INTO records (player_name, difficulty, time, date, replay, seed) "
+                             "VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def rows(self):
+        return sorted(self.conn.execute("SELECT player_name, difficulty, time, date, replay, seed FROM records"),
+                      key=repr)
+
+    def games(self):
+        """Число игр по сводной таблице, которая должна совпадать с records."""
+        return self.conn.execute("SELECT COALESCE(SUM(games), 0) FROM time_histogram").fetchone()[0]
+
+    def test_import_same_file_twice(self):
+        source = self.open_db("source.db")
+        self.insert(source, RECORDS)
+        for name in ("records.csv", "records.jsonl"):
+            path = os.path.join(self.dir, name)
+            self.assertEqual(export_records(source.cursor(), path), len(RECORDS))
+            self.conn.execute("DELETE FROM records")
+            self.conn.commit()
+            self.assertEqual(import_records(self.conn, path), len(RECORDS))
+            self.assertEqual(import_records(self.conn, path), 0)
+            self.assertEqual(self.rows(), sorted(RECORDS, key=repr))
+        source.close()
+
+    def test_merge_skips_duplicates(self):
+        self.insert(self.conn, RECORDS[:1])
+        other = self.open_db("other.db")
+        # Повторы внутри другой базы, в том числе с пустой датой, и рекорд, который уже есть здесь
+        self.insert(other, RECORDS + RECORDS[1:])
+        other.close()
+        path = os.path.join(self.dir, "other.db")
+        self.assertEqual(merge_records(self.conn, path), len(RECORDS) - 1)
+        self.assertEqual(merge_records(self.conn, path), 0)
+        self.assertEqual([row[:4] for row in self.rows()], sorted((row[:4] for row in RECORDS), key=repr))
+        self.assertEqual(self.games(), len(RECORDS))
+
+    def test_merge_old_database(self):
+        # В базе первых версий игры нет столбцов date, replay и seed
+        old = sqlite3.connect(os.path.join(self.dir, "old.db"))
+        old.execute("CREATE TABLE records (id INTEGER PRIMARY KEY, player_name TEXT, difficulty TEXT, time INTEGER)")
+        old.executemany("INSERT INTO records (player_name, difficulty, time) VALUES (?, ?, ?)",
+                        [("vera", "Сложный", 200)] * 2)
+        old.commit()
+        old.close()
+        path = os.path.join(self.dir, "old.db")
+        self.assertEqual(merge_records(self.conn, path), 1)
+        self.assertEqual(merge_records(self.conn, path), 0)
+        self.assertEqual(self.rows(), [("vera", "Сложный", 200, None, None, None)])
+
+    def test_merge_missing_file(self):
+        path = os.path.join(self.dir, "typo.db")
+        with self.assertRaises(OSError):
+            merge_records(self.conn, path)
+        self.assertFalse(os.path.exists(path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+"""Проверка записи партий и их проверки по таблице рекордов.
+
+Запуск: python -m unittest test_replay
+"""
+import unittest
+
+from game_logic import EASY_SIZE, Board, Game, LazyBoard, generate_board
+from replay import FLAG, HEADER, REVEAL, ReplayRecorder, decode, verify
+
+
+def winning_replay(board, num_mines):
+    """Запись партии, в которой по порядку открываются все безопасные клетки."""
+    game = Game(board, num_mines)
+    recorder = ReplayRecorder()
+    for index in range(board.width * board.height):
+        if not board.cells[index] & (Board.MINE | Board.REVEALED):
+            recorder.add(REVEAL, index, index * 10)
+            game.reveal(index % board.width, index // board.width)
+    return recorder.encode(board, num_mines)
+
+
+class EncodeDecodeTest(unittest.TestCase):
+
+    def test_bitset_round_trip(self):
+        board = generate_board(13, 7, 20, 3)
+        recorder = ReplayRecorder()
+        recorder.add(REVEAL, 5, 100)
+        recorder.add(FLAG, 90, 250)
+        decoded, num_mines, moves = decode(recorder.encode(board, 20))
+        self.assertEqual((decoded.width, decoded.height, num_mines), (13, 7, 20))
+        self.assertEqual(bytes(decoded.cells), bytes(generate_board(13, 7, 20, 3).cells))
+        self.assertEqual(moves, [(100, REVEAL, 5), (250, FLAG, 90)])
+
+    def test_seeded_round_trip(self):
+        board = LazyBoard(700, 500, 3000, 12345)
+        recorder = ReplayRecorder()
+        recorder.add(REVEAL, 350 * 700 + 250, 40)
+        decoded, num_mines, moves = decode(recorder.encode(board, 3000))
+        self.assertIsInstance(decoded, LazyBoard)
+        self.assertEqual((decoded.width, decoded.height, num_mines, decoded.seed), (700, 500, 3000, 12345))
+        self.assertEqual(decoded.cells[0:700 * 40], board.cells[0:700 * 40])
+        self.assertEqual(moves, [(40, REVEAL, 350 * 700 + 250)])
+
+
+class VerifyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.board = generate_board(*EASY_SIZE, 77)
+        self.data = winning_replay(self.board, EASY_SIZE[2])
+
+    def test_won_replay_passes(self):
+        self.assertIsNone(verify(self.data, "Легкий", 0, 77))
+        self.assertIsNone(verify(self.data, "Легкий", 0))
+
+    def test_wrong_seed(self):
+        self.assertIsNotNone(verify(self.data, "Легкий", 0, 78))
+
+    def test_wrong_mine_count(self):
+        # Одна мина при заявленных десяти: партия "выигрывается" раньше времени
+        forged = winning_replay(Board.from_mines(9, 9, [0]), 10)
+        self.assertIsNotNone(verify(forged, "Легкий", 0))
+
+    def test_wrong_difficulty(self):
+        self.assertIsNotNone(verify(self.data, "Средний", 0))
+
+    def test_wrong_time(self):
+        self.assertIsNotNone(verify(self.data, "Легкий", 30))
+
+    def test_truncated_record(self):
+        self.assertIsNotNone(verify(self.data[:-3], "Легкий", 0))
+        self.assertIsNotNone(verify(self.data[:HEADER.size - 1], "Легкий", 0))
+
+    def test_lost_replay(self):
+        self.assertIsNotNone(verify(ReplayRecorder().encode(self.board, EASY_SIZE[2]), "Легкий", 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+"""Проверка подсказок и полей без угадывания.
+
+Запуск: python -m unittest test_solver
+"""
+import random
+import unittest
+
+from game_logic import EASY_SIZE, HARD_SIZE, MEDIUM_SIZE, Game, generate_board
+from solver import find_hint, is_solvable, new_solvable_board
+
+
+class FindHintTest(unittest.TestCase):
+
+    def play_with_hints(self, size, seed):
+        """Играет по подсказкам, а когда их нет, открывает случайную безопасную клетку."""
+        width, height, num_mines = size
+        rng = random.Random(seed)
+        board = generate_board(width, height, num_mines, seed)
+        game = Game(board, num_mines)
+        hints = 0
+        while game.status == Game.PLAYING:
+            hint = find_hint(game)
+            if hint is None:
+                closed = [(x, y) for y in range(height) for x in range(width)
+                          if not board.is_mine(x, y) and not board.is_revealed(x, y)]
+                game.reveal(*rng.choice(closed))
+                continue
+            kind, x, y = hint
+            hints += 1
+            if kind == 'safe':
+                self.assertFalse(board.is_mine(x, y), f"seed {seed}: мина в безопасной клетке {x, y}")
+                self.assertFalse(board.is_revealed(x, y))
+                game.reveal(x, y)
+            else:
+                self.assertTrue(board.is_mine(x, y), f"seed {seed}: в клетке {x, y} нет мины")
+                self.assertFalse(board.is_flagged(x, y))
+                game.toggle_flag(x, y)
+        self.assertEqual(game.status, Game.WON)
+        return hints
+
+    def test_hints_are_never_wrong(self):
+        hints = 0
+        for seed in range(20):
+            hints += self.play_with_hints(EASY_SIZE, seed)
+            hints += self.play_with_hints(MEDIUM_SIZE, seed)
+        self.assertGreater(hints, 0)
+
+    def test_no_hint_before_first_move(self):
+        width, height, num_mines = EASY_SIZE
+        self.assertIsNone(find_hint(Game(generate_board(width, height, num_mines, 1), num_mines)))
+
+
+class NewSolvableBoardTest(unittest.TestCase):
+
+    def test_hard_boards_are_solvable(self):
+        width, height, num_mines = HARD_SIZE
+        for seed in range(5):
+            rng = random.Random(seed)
+            x, y = rng.randrange(width), rng.randrange(height)
+            board = new_solvable_board(width, height, num_mines, x, y, rng=rng)
+            self.assertEqual(board.cells.count(board.MINE), num_mines)
+            self.assertFalse(board.is_mine(x, y))
+            self.assertTrue(is_solvable(board, x, y), f"seed {seed}, первый ход {x, y}")
+
+
+if __name__ == "__main__":
+    unittest.main()